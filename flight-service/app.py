@@ -1,7 +1,20 @@
+import gzip
+import hashlib
+import json
 import os
+import threading
 import time
 import requests
-from flask import Flask, jsonify, request
+from email.utils import formatdate
+from flask import Flask, Response, jsonify, request
+
+try:  # brotli est optionnel: sans lui on ne propose que gzip
+    import brotli
+except ImportError:
+    brotli = None
+
+from snapshots import SnapshotReader, SnapshotWriter
+from spatial import FlightIndex
 
 TOKEN_URL = "https://auth.opensky-network.org/auth/realms/opensky-network/protocol/openid-connect/token"
 STATES_URL = "https://opensky-network.org/api/states/all"
@@ -13,6 +26,27 @@ CACHE_TTL_SECONDS = 90
 _token = None
 _token_expiry_ts = 0.0
 
+# Enregistrement des snapshots bruts (RECORD_DIR) / relecture (REPLAY_DIR)
+RECORD_DIR = os.environ.get("RECORD_DIR")
+RECORD_INTERVAL_SECONDS = int(os.environ.get("RECORD_INTERVAL_SECONDS", "0"))  # 0 = seulement sur /flights
+REPLAY_DIR = os.environ.get("REPLAY_DIR")
+REPLAY_SPEED = float(os.environ.get("REPLAY_SPEED", "1"))  # 1 = temps réel, 10 = 10x plus vite
+REPLAY_LOOP = os.environ.get("REPLAY_LOOP", "1") == "1"
+
+_recorder = SnapshotWriter(RECORD_DIR) if RECORD_DIR else None
+
+# Seul le snapshot global est mis en cache / enregistré / indexé (avec category)
+GLOBAL_PARAMS = {"extended": 1}
+
+_replay = None
+_replay_started = 0.0
+_replay_ts = None
+_replay_flights = None
+
+_index = None  # FlightIndex du dernier snapshot
+
+_representation = None  # corps JSON + ETag + versions compressées du dernier snapshot
+
 app = Flask(__name__)
 
 
@@ -77,7 +111,49 @@ def fetch_states_from_opensky(params):  # appelle OpenSky /states/all et renvoie
         resp = requests.get(STATES_URL, headers=headers, params=params, timeout=20)
 
     resp.raise_for_status()
-    return resp.json()
+    opensky_json = resp.json()
+    # Seuls les snapshots globaux sont enregistrés: la relecture les sert
+    # comme liste complète de /flights (une bbox n'en est qu'une partie)
+    if "lamin" not in params:
+        record_snapshot(opensky_json)
+    return opensky_json
+
+
+def record_snapshot(opensky_json):  # ajoute le snapshot brut dans RECORD_DIR (si activé)
+    if _recorder is None:
+        return
+    try:
+        _recorder.append(opensky_json)
+    except Exception as e:
+        print(f"⚠️ Enregistrement snapshot impossible: {e}")
+
+
+def record_loop():  # enregistre un snapshot global toutes les RECORD_INTERVAL_SECONDS
+    while True:
+        try:
+            fetch_states_from_opensky(GLOBAL_PARAMS)
+        except Exception as e:
+            print(f"⚠️ Enregistrement: OpenSky indisponible: {e}")
+        time.sleep(RECORD_INTERVAL_SECONDS)
+
+
+def replay_flights():  # vols du snapshot enregistré correspondant à l'horloge de relecture
+    global _replay, _replay_started, _replay_ts, _replay_flights
+
+    if _replay is None:
+        _replay = SnapshotReader(REPLAY_DIR)
+        _replay_started = time.time()
+
+    elapsed = (time.time() - _replay_started) * REPLAY_SPEED
+    span = _replay.end - _replay.start
+    if REPLAY_LOOP and span > 0:
+        elapsed %= span + 1
+
+    snapshot_ts, opensky_json = _replay.at(_replay.start + elapsed)
+    if snapshot_ts != _replay_ts:
+        _replay_flights = normalize_flights(opensky_json)
+        _replay_ts = snapshot_ts
+    return _replay_flights
 
 
 def normalize_flights(opensky_json):  # transforme le format OpenSky (tableaux) en liste d'objets propres
@@ -128,45 +204,180 @@ def normalize_flights(opensky_json):  # transforme le format OpenSky (tableaux)
     return flights
 
 
-@app.get("/flights")
-def get_flights():  # handler Flask
+def snapshot_flights():  # snapshot global courant (cache 90s, ou relecture) -> liste de vols
     global _cache_data
     global _cache_ts
 
+    if REPLAY_DIR:
+        return replay_flights()
+
     now = time.time()
     if _cache_data is not None and (now - _cache_ts) < CACHE_TTL_SECONDS:
-        return jsonify(_cache_data)
+        return _cache_data
+
+    opensky_json = fetch_states_from_opensky(GLOBAL_PARAMS)
+    flights = normalize_flights(opensky_json)
+
+    _cache_data = flights
+    _cache_ts = now
+    return flights
+
+
+def current_flights(bbox=None):  # vols du snapshot global, filtrés sur bbox = (lamin, lomin, lamax, lomax)
+    flights = snapshot_flights()
+    if bbox is None:
+        return flights
+    # Filtré depuis le snapshot global: une bbox n'écrase jamais le cache
+    lamin, lomin, lamax, lomax = bbox
+    return [
+        f for f in flights
+        if lamin <= f["lat"] <= lamax and lomin <= f["lon"] <= lomax
+    ]
+
+
+def current_index():  # index spatial du snapshot courant (reconstruit seulement si le snapshot change)
+    global _index
 
+    flights = snapshot_flights()
+    if _index is None or _index.flights is not flights:
+        _index = FlightIndex(flights)
+    return _index
+
+
+@app.get("/flights")
+def get_flights():  # handler Flask
     lamin = request.args.get("lamin", type=float)
     lomin = request.args.get("lomin", type=float)
     lamax = request.args.get("lamax", type=float)
     lomax = request.args.get("lomax", type=float)
-    extended = request.args.get("extended", default=0, type=int)
+    # extended=1 reste accepté: le snapshot global inclut toujours category
 
-    params = {}
+    bbox = None
     if lamin is not None and lomin is not None and lamax is not None and lomax is not None:
-        params["lamin"] = lamin
-        params["lomin"] = lomin
-        params["lamax"] = lamax
-        params["lomax"] = lomax
-    if extended == 1:
-        params["extended"] = 1
+        bbox = (lamin, lomin, lamax, lomax)
 
     try:
-        opensky_json = fetch_states_from_opensky(params)
-        flights = normalize_flights(opensky_json)
+        flights = current_flights(bbox)
     except Exception as e:
-        return jsonify({"error": "OpenSky request failed", "details": str(e)}), 502
+        error = "Replay failed" if REPLAY_DIR else "OpenSky request failed"
+        return jsonify({"error": error, "details": str(e)}), 502
+
+    rep = snapshot_representation(flights)
+    headers = {
+        "ETag": rep["etag"],
+        "Last-Modified": rep["last_modified"],
+        "Cache-Control": f"max-age={cache_max_age()}",
+        "Vary": "Accept-Encoding",
+    }
+
+    # Requête conditionnelle: le client a déjà ce snapshot
+    if request.if_none_match:
+        if request.if_none_match.contains_weak(rep["etag_value"]):
+            return Response(status=304, headers=headers)
+    elif (
+        not REPLAY_DIR  # en boucle, l'horloge de relecture revient en arrière: ETag seulement
+        and request.if_modified_since
+        and request.if_modified_since.timestamp() >= int(rep["ts"])
+    ):
+        return Response(status=304, headers=headers)
+
+    encoding = negotiate_encoding()
+    body = rep["body"] if encoding is None else compressed_body(rep, encoding)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+def snapshot_ts():  # horodatage du snapshot courant
+    return _replay_ts if REPLAY_DIR else _cache_ts
+
+
+def cache_max_age():  # secondes avant que le snapshot en cache expire
+    if REPLAY_DIR:
+        return 0
+    return max(0, int(CACHE_TTL_SECONDS - (time.time() - _cache_ts)))
+
+
+def build_representation(flights):  # sérialise une liste de vols (JSON + ETag)
+    body = json.dumps(flights, separators=(",", ":")).encode("utf-8")
+    ts = snapshot_ts() or time.time()
+    etag_value = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return {
+        "flights": flights,
+        "body": body,
+        # ETag faible: le même pour toutes les versions compressées
+        "etag_value": etag_value,
+        "etag": f'W/"{etag_value}"',
+        "ts": ts,
+        "last_modified": formatdate(ts, usegmt=True),
+        "encoded": {},
+    }
+
+
+def snapshot_representation(flights):  # sérialise le snapshot global une seule fois, une bbox à chaque fois
+    global _representation
+
+    if flights is not _cache_data and flights is not _replay_flights:
+        return build_representation(flights)
+    if _representation is None or _representation["flights"] is not flights:
+        _representation = build_representation(flights)
+    return _representation
+
+
+def negotiate_encoding():  # "br", "gzip" ou None selon Accept-Encoding
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"] > 0 and accepted["br"] >= accepted["gzip"]:
+        return "br"
+    if accepted["gzip"] > 0:
+        return "gzip"
+    return None
+
+
+def compressed_body(rep, encoding):  # compresse le corps une seule fois par snapshot et par encodage
+    body = rep["encoded"].get(encoding)
+    if body is None:
+        if encoding == "br":
+            body = brotli.compress(rep["body"], quality=5)
+        else:
+            body = gzip.compress(rep["body"], compresslevel=6)
+        rep["encoded"][encoding] = body
+    return body
+
+
+@app.get("/flights/near")
+def get_flights_near():  # vols autour d'un point: rayon (radius_km) et/ou k plus proches (k)
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    radius_km = request.args.get("radius_km", type=float)
+    k = request.args.get("k", type=int)
+
+    if lat is None or lon is None or not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+        return jsonify({"error": "lat et lon sont obligatoires (degrés valides)"}), 400
+    if radius_km is None and k is None:
+        return jsonify({"error": "radius_km ou k est obligatoire"}), 400
+    if (radius_km is not None and radius_km < 0) or (k is not None and k < 1):
+        return jsonify({"error": "radius_km doit être >= 0 et k >= 1"}), 400
 
-    _cache_data = flights
-    _cache_ts = now
-    return jsonify(flights)
+    try:
+        index = current_index()
+    except Exception as e:
+        error = "Replay failed" if REPLAY_DIR else "OpenSky request failed"
+        return jsonify({"error": error, "details": str(e)}), 502
+
+    if k is not None:
+        matches = index.nearest(lat, lon, k, radius_km=radius_km)
+    else:
+        matches = index.within(lat, lon, radius_km)
+
+    return jsonify([dict(flight, distance_km=round(d, 3)) for d, flight in matches])
 
 
 def main():  # fonction main()
     host = os.environ.get("HOST", "0.0.0.0")
     port = int(os.environ.get("PORT", "5000"))
     debug = os.environ.get("DEBUG", "0") == "1"
+    if _recorder is not None and RECORD_INTERVAL_SECONDS > 0 and not REPLAY_DIR:
+        threading.Thread(target=record_loop, daemon=True).start()
     app.run(host=host, port=port, debug=debug)
 
 
@@ -0,0 +1,219 @@
+# Enregistrement / relecture des snapshots OpenSky (state vectors bruts).
+#
+# Format d'un fichier .fsnap (append-only, un fichier par heure) :
+#
+#   b"FSNP" + version (1 octet)
+#   puis une suite de blocs, un par snapshot :
+#     u32 taille_meta | meta (JSON utf-8) | colonnes compressées (zlib)
+#
+# meta = {"time": <ts OpenSky>, "n": <nb d'avions>, "cols": [[nom, type, taille], ...]}
+# Chaque colonne est stockée séparément (format colonnes) :
+#   - "f" : float64 little-endian, NaN = None
+#   - "b" : int8, -1 = None
+#   - "s" : chaînes séparées par "\n", "\x00" = None
+#
+# Le lecteur mappe le fichier en mémoire (mmap) et n'indexe que les en-têtes :
+# une colonne n'est décompressée que quand on lit le snapshot.
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+MAGIC = b"FSNP"
+VERSION = 1
+FILE_SUFFIX = ".fsnap"
+HEADER_SIZE = len(MAGIC) + 1  # MAGIC + version
+
+# Colonnes du state vector OpenSky (index -> nom, type). "sensors" (12) n'est pas gardé.
+COLUMNS = [
+    (0, "icao24", "s"),
+    (1, "callsign", "s"),
+    (2, "origin_country", "s"),
+    (3, "time_position", "f"),
+    (4, "last_contact", "f"),
+    (5, "lon", "f"),
+    (6, "lat", "f"),
+    (7, "baro_altitude", "f"),
+    (8, "on_ground", "b"),
+    (9, "velocity", "f"),
+    (10, "true_track", "f"),
+    (11, "vertical_rate", "f"),
+    (13, "geo_altitude", "f"),
+    (14, "squawk", "s"),
+    (15, "spi", "b"),
+    (16, "position_source", "f"),
+    (17, "category", "f"),
+]
+INT_COLUMNS = {"time_position", "last_contact", "position_source", "category"}
+
+_LITTLE = sys.byteorder == "little"
+
+
+def _encode_column(values, kind):  # encode une colonne en bytes non compressés
+    if kind == "f":
+        arr = array("d", (math.nan if v is None else float(v) for v in values))
+    elif kind == "b":
+        arr = array("b", (-1 if v is None else int(bool(v)) for v in values))
+    else:
+        return "\n".join("\x00" if v is None else str(v).replace("\n", " ") for v in values).encode("utf-8")
+    if not _LITTLE:
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _decode_column(raw, kind, n, name):  # inverse de _encode_column
+    if kind == "s":
+        if n == 0:
+            return []
+        return [None if v == "\x00" else v for v in raw.decode("utf-8").split("\n")]
+    arr = array("d" if kind == "f" else "b")
+    arr.frombytes(raw)
+    if not _LITTLE:
+        arr.byteswap()
+    if kind == "b":
+        return [None if v < 0 else bool(v) for v in arr]
+    if name in INT_COLUMNS:
+        return [None if math.isnan(v) else int(v) for v in arr]
+    return [None if math.isnan(v) else v for v in arr]
+
+
+def encode_snapshot(opensky_json):  # snapshot OpenSky brut -> bloc binaire
+    states = opensky_json.get("states") or []
+    cols = []
+    blobs = []
+    for index, name, kind in COLUMNS:
+        values = [s[index] if len(s) > index else None for s in states]
+        blob = zlib.compress(_encode_column(values, kind), 6)
+        cols.append([name, kind, len(blob)])
+        blobs.append(blob)
+
+    meta = json.dumps({
+        "time": opensky_json.get("time") or int(time.time()),
+        "n": len(states),
+        "cols": cols,
+    }).encode("utf-8")
+    return struct.pack("<I", len(meta)) + meta + b"".join(blobs)
+
+
+def decode_snapshot(buf, offset):  # lit le bloc à offset -> (meta, json OpenSky, offset suivant)
+    (meta_len,) = struct.unpack_from("<I", buf, offset)
+    pos = offset + 4
+    meta = json.loads(bytes(buf[pos:pos + meta_len]))
+    pos += meta_len
+
+    columns = {}
+    for name, kind, size in meta["cols"]:
+        columns[name] = _decode_column(zlib.decompress(buf[pos:pos + size]), kind, meta["n"], name)
+        pos += size
+
+    states = []
+    for i in range(meta["n"]):
+        s = [None] * 18
+        for index, name, _ in COLUMNS:
+            s[index] = columns[name][i]
+        states.append(s)
+    return meta, {"time": meta["time"], "states": states}, pos
+
+
+class SnapshotWriter:  # ajoute des snapshots dans RECORD_DIR (un fichier par heure UTC)
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()  # appelé depuis les threads Flask et record_loop
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, ts):
+        return os.path.join(self.directory, time.strftime("states-%Y%m%d%H", time.gmtime(ts)) + FILE_SUFFIX)
+
+    def append(self, opensky_json):
+        block = encode_snapshot(opensky_json)
+        ts = opensky_json.get("time") or time.time()
+        path = self.path_for(ts)
+        with self._lock:  # sinon deux threads peuvent écrire l'en-tête d'un nouveau fichier
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, "ab") as f:
+                if new_file:
+                    f.write(MAGIC + bytes([VERSION]))
+                f.write(block)
+        return path
+
+
+class SnapshotFile:  # un fichier .fsnap mappé en mémoire, indexé par timestamp
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buf[:4] != MAGIC:
+            raise ValueError(f"{path}: pas un fichier snapshot")
+        self.index = []  # [(time, offset)]
+        offset = HEADER_SIZE
+        size = len(self._buf)
+        while offset + 4 <= size:
+            (meta_len,) = struct.unpack_from("<I", self._buf, offset)
+            if offset + 4 + meta_len > size:
+                break  # bloc en cours d'écriture
+            meta = json.loads(bytes(self._buf[offset + 4:offset + 4 + meta_len]))
+            end = offset + 4 + meta_len + sum(c[2] for c in meta["cols"])
+            if end > size:
+                break
+            self.index.append((meta["time"], offset))
+            offset = end
+
+    def read(self, offset):
+        _, opensky_json, _ = decode_snapshot(self._buf, offset)
+        return opensky_json
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+
+class SnapshotReader:  # tous les snapshots d'un dossier, triés par timestamp
+
+    def __init__(self, directory):
+        self.files = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            # Fichier vide ou tronqué à la création: mmap refuse un fichier de 0 octet
+            if name.endswith(FILE_SUFFIX) and os.path.getsize(path) >= HEADER_SIZE:
+                self.files.append(SnapshotFile(path))
+        self.index = sorted(
+            (ts, i, offset) for i, f in enumerate(self.files) for ts, offset in f.index
+        )
+        if not self.index:
+            raise ValueError(f"Aucun snapshot dans {directory}")
+
+    @property
+    def start(self):
+        return self.index[0][0]
+
+    @property
+    def end(self):
+        return self.index[-1][0]
+
+    def __iter__(self):  # itère sur (time, json OpenSky) dans l'ordre chronologique
+        for ts, i, offset in self.index:
+            yield ts, self.files[i].read(offset)
+
+    def at(self, ts):  # dernier snapshot dont le timestamp est <= ts
+        lo, hi = 0, len(self.index)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.index[mid][0] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        ts, i, offset = self.index[max(0, lo - 1)]
+        return ts, self.files[i].read(offset)
+
+    def close(self):
+        for f in self.files:
+            f.close()
@@ -0,0 +1,106 @@
+# Index spatial des vols (KD-tree) pour /flights/near.
+#
+# Les positions (lat, lon) sont converties en points 3D sur la sphère unité.
+# La distance en ligne droite (corde) entre deux points est une fonction
+# croissante de la distance orthodromique, donc un KD-tree euclidien 3D
+# donne des résultats exacts pour "rayon" et "k plus proches", sans souci
+# d'antiméridien ni de pôles. Les distances renvoyées sont en km (grand cercle).
+
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_xyz(lat, lon):  # point sur la sphère unité
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord):  # longueur de corde (sphère unité) -> distance grand cercle en km
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km):  # inverse de chord_to_km
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class FlightIndex:  # KD-tree construit une fois par snapshot de vols
+
+    def __init__(self, flights):
+        self.flights = flights
+        self.points = [to_xyz(f["lat"], f["lon"]) for f in flights]
+        # Noeuds stockés à plat: nodes[i] = (index du vol, axe, gauche, droite), -1 = vide
+        self.nodes = []
+        self.root = self._build(list(range(len(flights))), 0)
+
+    def _build(self, ids, depth):
+        if not ids:
+            return -1
+        axis = depth % 3
+        ids.sort(key=lambda i: self.points[i][axis])
+        mid = len(ids) // 2
+        node = len(self.nodes)
+        self.nodes.append(None)
+        left = self._build(ids[:mid], depth + 1)
+        right = self._build(ids[mid + 1:], depth + 1)
+        self.nodes[node] = (ids[mid], axis, left, right)
+        return node
+
+    def _dist2(self, i, q):
+        p = self.points[i]
+        return (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 + (p[2] - q[2]) ** 2
+
+    def within(self, lat, lon, radius_km):  # vols à moins de radius_km -> [(distance_km, vol)] triés
+        q = to_xyz(lat, lon)
+        r = km_to_chord(radius_km)
+        r2 = r * r
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            i, axis, left, right = self.nodes[node]
+            if self._dist2(i, q) <= r2:
+                found.append(i)
+            diff = q[axis] - self.points[i][axis]
+            if diff <= r:
+                stack.append(left)
+            if diff >= -r:
+                stack.append(right)
+        result = [(chord_to_km(math.sqrt(self._dist2(i, q))), i) for i in found]
+        result.sort()
+        return [(d, self.flights[i]) for d, i in result]
+
+    def nearest(self, lat, lon, k, radius_km=None):  # k vols les plus proches -> [(distance_km, vol)]
+        q = to_xyz(lat, lon)
+        limit2 = km_to_chord(radius_km) ** 2 if radius_km is not None else math.inf
+        heap = []  # max-heap de taille k: (-dist2, index)
+
+        def worst():
+            return -heap[0][0] if len(heap) == k else limit2
+
+        stack = [(self.root, 0.0)]  # (noeud, distance² minimale possible)
+        while stack and k > 0:
+            node, bound = stack.pop()
+            if node < 0 or bound > worst():
+                continue
+            i, axis, left, right = self.nodes[node]
+            d2 = self._dist2(i, q)
+            if d2 <= worst():
+                if len(heap) == k:
+                    heapq.heapreplace(heap, (-d2, i))
+                else:
+                    heapq.heappush(heap, (-d2, i))
+            diff = q[axis] - self.points[i][axis]
+            near, far = (left, right) if diff <= 0 else (right, left)
+            # Le côté lointain n'est visité que s'il peut contenir mieux
+            if diff * diff <= worst():
+                stack.append((far, diff * diff))
+            stack.append((near, 0.0))
+
+        result = sorted((math.sqrt(-neg), i) for neg, i in heap)
+        return [(chord_to_km(c), self.flights[i]) for c, i in result]
@@ -4,12 +4,23 @@ REST API
 Endpoints REST pour gérer les impacts météo.
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Response, Header, Request
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 
-from app.services.impact_calculator import calculate_impact
+from app.services.impact_calculator import calculate_impacts
 from app.services.flight_client import get_flights
 from app.services.satellite_client import trigger_satellite_tile
+from app.services.impact_store import save_impacts
+from app.services.impact_stream import stream_impacts
+from app.services.resilience import request_deadline
+from app.services.heatmap import HEATMAP_ZOOMS, get_heatmap
+from app.services import ingestion
+from app.services.health import status as health_status
+from app.services import diagnostics
+from app.config import get_settings
 from app.db.mongodb import get_db, doc_to_dict
 
 router = APIRouter(prefix="/api", tags=["impacts"])
@@ -19,12 +30,24 @@ router = APIRouter(prefix="/api", tags=["impacts"])
 
 @router.get("/health")
 async def health():
-    """Vérifie que le service et MongoDB fonctionnent."""
-    try:
-        await get_db().impact.find_one()
+    """Vérifie que le service et MongoDB fonctionnent (état en cache, sans requête MongoDB)."""
+    if health_status["mongo"]:
         return {"status": "ok", "mongo": True}
-    except:
-        return {"status": "error", "mongo": False}
+    return {"status": "error", "mongo": False}
+
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness probe: le processus et la boucle d'événements répondent."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness(response: Response):
+    """Readiness probe: warm-up terminé et dernier ping MongoDB OK (état en cache)."""
+    if not health_status["ready"]:
+        response.status_code = 503
+    return {"status": "ready" if health_status["ready"] else "not_ready", **health_status}
 
 
 @router.post("/impacts", status_code=201)
@@ -35,44 +58,78 @@ async def create_impacts(limit: int = 10, background_tasks: BackgroundTasks = No
     Flow:
     1. Récupère les vols depuis flight-service (Bastien)
     2. Pour chaque vol: calcule l'impact météo
-    3. Sauvegarde en MongoDB
-    4. Déclenche satellite-service (Thomas) pour générer les tuiles
+    3. Sauvegarde en MongoDB (un document par vol et tranche de temps:
+       une ré-analyse dans la même tranche met à jour l'impact existant)
+    4. Déclenche satellite-service (Thomas) pour générer les tuiles,
+       seulement si la position ou la sévérité a changé
     
     Paramètre:
     - limit: nombre de vols à analyser (défaut: 10)
     """
-    # Récupérer les vols depuis flight-service
-    flights = await get_flights()
+    # Budget global: les appels amont (flights, weather) s'arrêtent à temps
+    with request_deadline(get_settings().request_deadline_seconds):
+        # Récupérer les vols depuis flight-service
+        flights = await get_flights()
+        
+        # Calculer l'impact météo de chaque vol
+        impacts = await calculate_impacts(flights[:limit])
+    
+    # Sauvegarder en MongoDB (upsert par vol et tranche de temps)
+    saved = await save_impacts(get_db(), impacts)
     
-    # Analyser chaque vol
     results = []
-    for flight in flights[:limit]:
-        # Calculer l'impact météo
-        impact = await calculate_impact(flight)
-        
-        # Sauvegarder en MongoDB
-        impact_id = ObjectId()
-        doc = impact.model_dump()
-        doc["_id"] = impact_id
-        await get_db().impact.insert_one(doc)
+    for entry in saved:
+        impact = entry["impact"]
         
-        # Déclencher satellite-service (après sauvegarde)
-        if background_tasks:
-            background_tasks.add_task(trigger_satellite_tile, str(impact_id))
-        else:
-            await trigger_satellite_tile(str(impact_id))
+        # Déclencher satellite-service seulement si l'impact est nouveau
+        # ou a changé de façon significative (après sauvegarde)
+        if entry["trigger_tile"]:
+            if background_tasks:
+                background_tasks.add_task(trigger_satellite_tile, entry["id"])
+            else:
+                await trigger_satellite_tile(entry["id"])
         
         results.append({
-            "id": str(impact_id),
+            "id": entry["id"],
             "flight_id": impact.flight_id,
             "callsign": impact.callsign,
             "severity": impact.severity.value,
-            "impact_score": impact.impact_score
+            "impact_score": impact.impact_score,
+            "created": entry["created"]
         })
     
     return {"analyzed": len(results), "impacts": results}
 
 
+@router.post("/impacts/stream")
+async def create_impacts_stream(request: Request, limit: int = 10, format: str = "ndjson"):
+    """
+    Comme POST /impacts, mais chaque impact est envoyé dès qu'il est
+    calculé et sauvegardé, suivi d'un résumé final.
+    
+    Formats:
+    - ndjson (défaut): un objet JSON par ligne (application/x-ndjson)
+    - sse: Server-Sent Events (aussi choisi si Accept: text/event-stream)
+    
+    Chaque ligne / événement a un champ "type": "impact", puis "summary"
+    en fin de flux, ou "error" si le flux a été interrompu.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format doit être 'ndjson' ou 'sse'")
+    
+    if format == "sse" or "text/event-stream" in request.headers.get("accept", ""):
+        async def sse():
+            async for event in stream_impacts(limit):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        return StreamingResponse(sse(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+    
+    async def ndjson():
+        async for event in stream_impacts(limit):
+            yield json.dumps(event) + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 @router.get("/impacts")
 async def list_impacts(limit: int = 50):
     """Liste tous les impacts (limité à 50 par défaut)."""
@@ -103,8 +160,64 @@ async def delete_impact(impact_id: str):
     return {"deleted": True}
 
 
+@router.get("/heatmap")
+async def heatmap(zoom: int = 4, hours: int = 1):
+    """
+    Carte de chaleur des impacts sur une grille de quadkeys.
+    
+    Pour chaque cellule: nombre d'impacts, score max et danger dominant.
+    Servie depuis des tuiles précalculées (rafraîchies incrémentalement).
+    
+    Paramètres:
+    - zoom: niveau de la grille (2, 4, 6, 8 ou 10)
+    - hours: fenêtre de temps en heures (défaut: 1)
+    """
+    if zoom not in HEATMAP_ZOOMS:
+        raise HTTPException(status_code=400, detail=f"zoom doit être dans {list(HEATMAP_ZOOMS)}")
+    max_hours = get_settings().heatmap_max_hours
+    if not 1 <= hours <= max_hours:
+        raise HTTPException(status_code=400, detail=f"hours doit être entre 1 et {max_hours}")
+    return await get_heatmap(get_db(), zoom, hours)
+
+
+@router.get("/ingestion")
+async def ingestion_status():
+    """État de l'ingestion coordonnée: bandes détenues par ce réplica et dernier cycle."""
+    return {"enabled": get_settings().ingestion_enabled, **ingestion.status}
+
+
 @router.get("/stats")
 async def stats():
     """Statistiques sur les impacts."""
     count = await get_db().impact.count_documents({})
     return {"total": count}
+
+
+# ============ ADMIN ============
+
+def _require_admin(token: Optional[str]):
+    if not diagnostics.is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token invalide ou non configuré")
+
+
+@router.get("/admin/diagnostics")
+async def admin_diagnostics(x_admin_token: Optional[str] = Header(None)):
+    """Statistiques du moniteur de lag de la boucle asyncio."""
+    _require_admin(x_admin_token)
+    return diagnostics.lag_stats
+
+
+@router.post("/admin/profile")
+async def admin_profile(seconds: float = 10, x_admin_token: Optional[str] = Header(None)):
+    """
+    Profile la boucle asyncio pendant `seconds` secondes (max 60).
+    
+    Écrit un fichier .folded (flame graph) dans PROFILE_DIR et retourne son chemin.
+    """
+    _require_admin(x_admin_token)
+    if not 0 < seconds <= 60:
+        raise HTTPException(status_code=400, detail="seconds doit être entre 0 et 60")
+    path = await diagnostics.profile_for(seconds)
+    if path is None:
+        raise HTTPException(status_code=409, detail="Un profil est déjà en cours")
+    return {"profile": path}
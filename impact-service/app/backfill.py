@@ -0,0 +1,180 @@
+"""
+Backfill
+========
+Recalcule les impacts à partir de snapshots OpenSky enregistrés
+(flight-service, RECORD_DIR), sans passer par l'API HTTP.
+
+- Les snapshots sont découpés en lots, calculés en parallèle dans un
+  pool de processus (même logique que calculate_impacts).
+- Les résultats sont écrits en MongoDB par bulk upserts (même clé
+  (flight_id, tranche de temps) que l'API: relancer est idempotent).
+- Un fichier de checkpoint permet de reprendre là où on s'est arrêté.
+
+Usage:
+    python -m app.backfill /data/snapshots --workers 8
+    python -m app.backfill /data/snapshots --since 1736420000 --until 1736506400
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from app.config import get_settings
+from app.db import mongodb
+from app.services.impact_calculator import calculate_impacts
+from app.services.impact_store import bulk_upsert_docs
+from app.services.resilience import close_upstreams
+from app.services.snapshot_reader import list_snapshots, read_positions
+
+
+# ============ WORKER (processus du pool) ============
+
+async def _score_batch(batch: list[tuple[int, str, int]]) -> list[dict]:
+    docs = []
+    try:
+        for _, path, offset in batch:
+            impacts = await calculate_impacts(read_positions(path, offset))
+            docs.extend(impact.model_dump() for impact in impacts)
+    finally:
+        # Chaque lot a sa propre boucle (asyncio.run): les clients httpx
+        # sont liés à la boucle, on ne les garde pas pour le lot suivant
+        await close_upstreams()
+    return docs
+
+
+def process_batch(batch: list[tuple[int, str, int]]) -> tuple[int, list[dict]]:
+    """Calcule les impacts d'un lot de snapshots. Retourne (nb vols, docs)."""
+    docs = asyncio.run(_score_batch(batch))
+    return len(docs), docs
+
+
+# ============ CHECKPOINT ============
+
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"last_time": None, "snapshots": 0, "impacts": 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # Écriture atomique: un crash ne laisse jamais un checkpoint à moitié écrit
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# ============ MAIN ============
+
+async def run(args):
+    checkpoint_path = args.checkpoint or os.path.join(args.snapshots, ".backfill-checkpoint.json")
+    checkpoint = load_checkpoint(checkpoint_path) if not args.restart else {
+        "last_time": None, "snapshots": 0, "impacts": 0
+    }
+
+    # Snapshots à traiter (après le checkpoint, dans la fenêtre demandée)
+    index = list_snapshots(args.snapshots)
+    if checkpoint["last_time"] is not None:
+        index = [s for s in index if s[0] > checkpoint["last_time"]]
+    if args.since is not None:
+        index = [s for s in index if s[0] >= args.since]
+    if args.until is not None:
+        index = [s for s in index if s[0] <= args.until]
+
+    if not index:
+        print("✅ Rien à traiter")
+        return
+
+    batches = [index[i:i + args.batch_size] for i in range(0, len(index), args.batch_size)]
+    print(f"🚀 Backfill: {len(index)} snapshots, {len(batches)} lots, {args.workers} workers")
+
+    loop = asyncio.get_running_loop()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Démarrer les workers (fork) avant de créer le client Motor et
+        # ses threads de monitoring: les enfants n'en héritent pas
+        await loop.run_in_executor(pool, os.getpid)
+
+        # init_db tolère un MongoDB absent (démarrage de l'app): ici on
+        # échoue tout de suite plutôt qu'après le calcul du premier lot
+        await mongodb.init_db()
+        try:
+            await mongodb.ping_db()
+            await mongodb.create_indexes()
+        except Exception as e:
+            await mongodb.close_db()
+            raise SystemExit(f"❌ MongoDB injoignable: {e!r}")
+        db = mongodb.get_db()
+
+        started = time.monotonic()
+        total_flights = 0
+        total_written = 0
+
+        # Les lots sont calculés en parallèle mais consommés dans l'ordre:
+        # le checkpoint avance toujours de façon monotone. On limite le
+        # nombre de lots en avance pour ne pas accumuler les résultats
+        # en mémoire si MongoDB écrit moins vite que le pool ne calcule.
+        pending = deque()
+        remaining = iter(batches)
+        for batch in islice(remaining, args.workers * 2):
+            pending.append((batch, loop.run_in_executor(pool, process_batch, batch)))
+
+        try:
+            while pending:
+                batch, future = pending.popleft()
+                flights, docs = await future
+                for next_batch in islice(remaining, 1):
+                    pending.append((next_batch, loop.run_in_executor(pool, process_batch, next_batch)))
+
+                written = await bulk_upsert_docs(db, docs)
+
+                total_flights += flights
+                total_written += written
+                checkpoint["last_time"] = batch[-1][0]
+                checkpoint["snapshots"] += len(batch)
+                checkpoint["impacts"] += written
+                save_checkpoint(checkpoint_path, checkpoint)
+
+                elapsed = time.monotonic() - started
+                print(
+                    f"📦 {checkpoint['snapshots']} snapshots | "
+                    f"{total_flights / elapsed:.0f} vols/s | "
+                    f"{total_written} impacts écrits | t={batch[-1][0]}"
+                )
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    elapsed = time.monotonic() - started
+    print(
+        f"✅ Backfill terminé en {elapsed:.1f}s: {total_flights} vols "
+        f"({total_flights / elapsed:.0f} vols/s), {total_written} impacts écrits"
+    )
+    await mongodb.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcule les impacts depuis des snapshots enregistrés")
+    parser.add_argument("snapshots", help="Dossier des fichiers .fsnap (RECORD_DIR de flight-service)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processus de calcul")
+    parser.add_argument("--batch-size", type=int, default=10, help="Snapshots par lot")
+    parser.add_argument("--since", type=int, help="Timestamp Unix de début (inclus)")
+    parser.add_argument("--until", type=int, help="Timestamp Unix de fin (inclus)")
+    parser.add_argument("--checkpoint", help="Fichier de checkpoint (défaut: <snapshots>/.backfill-checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore le checkpoint existant")
+    args = parser.parse_args()
+
+    if not get_settings().use_mock_weather:
+        print("⚠️ USE_MOCK_WEATHER=false: chaque vol appellera weather-service")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
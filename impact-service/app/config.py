@@ -7,6 +7,8 @@ class Settings(BaseSettings):
     # MongoDB
     mongo_url: str = "mongodb://mongo:27017"
     mongo_db: str = "archi_project"  # Same DB as satellite-service
+    mongo_min_pool_size: int = 5
+    mongo_server_selection_timeout_ms: int = 5000
     
     # Services URLs
     flight_service_url: str = "http://flight-service:5000"
@@ -19,6 +21,50 @@ class Settings(BaseSettings):
     # Feature flags (set to false to use real services)
     use_mock_weather: bool = True
     use_mock_satellite: bool = True
+    # Mock météo: "random" (tirages indépendants) ou "synthetic" (champ
+    # déterministe et cohérent dans l'espace, pour les tests de charge)
+    mock_weather_mode: str = "random"
+    synthetic_weather_seed: int = 42
+    
+    # Résilience des appels amont
+    request_deadline_seconds: float = 20.0      # budget global d'une requête
+    flight_timeout_seconds: float = 30.0
+    weather_timeout_seconds: float = 10.0
+    satellite_timeout_seconds: float = 10.0
+    circuit_failure_threshold: int = 5          # échecs avant ouverture du circuit
+    circuit_reset_seconds: float = 30.0         # durée d'ouverture avant un appel test
+    weather_hedge_after_seconds: float = 0.8    # 0 = pas de requête de secours
+    satellite_concurrency: int = 10             # tuiles satellite lancées en fond en parallèle
+    stream_concurrency: int = 10                # vols analysés en parallèle en streaming
+    
+    # Impacts: un document par (vol, tranche de temps)
+    impact_bucket_seconds: int = 300
+    # Distance minimale (km) avant de redemander une tuile satellite
+    tile_min_distance_km: float = 25.0
+    
+    # Heatmap des impacts
+    heatmap_refresh_seconds: int = 30   # fréquence max de rafraîchissement des tuiles
+    heatmap_max_hours: int = 24         # historique conservé dans les tuiles
+    
+    # Démarrage et probes
+    warmup_timeout_seconds: float = 15.0       # durée max du warm-up
+    health_check_interval_seconds: float = 10.0  # fréquence du ping MongoDB en fond
+    
+    # Diagnostics: moniteur de lag de la boucle asyncio et profiler
+    loop_lag_threshold_ms: float = 200.0    # blocage logué au-delà (0 = désactivé)
+    loop_lag_interval_ms: float = 50.0
+    admin_token: str = ""                   # vide = profiler désactivé
+    profile_dir: str = "/tmp/impact-profiles"
+    profile_interval_ms: float = 5.0        # période d'échantillonnage
+    
+    # Ingestion coordonnée entre réplicas (bandes de longitude + baux MongoDB)
+    ingestion_enabled: bool = False
+    ingestion_shards: int = 12              # nombre de bandes de longitude
+    ingestion_interval_seconds: int = 90    # un cycle d'analyse par intervalle
+    ingestion_concurrency: int = 10         # calculs d'impact en parallèle
+    lease_ttl_seconds: int = 30             # un bail non renouvelé expire après ce délai
+    lease_heartbeat_seconds: int = 10
+    replica_id: str = ""                    # défaut: hostname:pid
     
     class Config:
         env_file = ".env"
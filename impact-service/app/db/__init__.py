@@ -1 +1 @@
-from .mongodb import init_db, close_db, get_db
+from .mongodb import init_db, close_db, get_db, ping_db
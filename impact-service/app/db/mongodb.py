@@ -6,22 +6,59 @@ Gère la connexion à MongoDB avec Motor (driver async).
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from app.config import get_settings
+from app.services.impact_store import ensure_indexes
+from app.services.heatmap import ensure_heatmap_indexes
 
-# Variable globale pour stocker la connexion
+# Variables globales pour stocker la connexion
+client: AsyncIOMotorClient = None
 db: AsyncIOMotorDatabase = None
+indexes_ready = False
 
 
 async def init_db():
-    """Initialise la connexion MongoDB au démarrage de l'app."""
-    global db
+    """
+    Initialise la connexion MongoDB au démarrage de l'app.
+    
+    Le ping force l'ouverture du pool (minPoolSize connexions) pendant
+    le démarrage plutôt qu'à la première vraie requête.
+    Si MongoDB n'est pas encore joignable, l'app démarre quand même
+    (non prête): le moniteur de santé réessaie et crée les index ensuite.
+    """
+    global client, db
     settings = get_settings()
-    client = AsyncIOMotorClient(settings.mongo_url)
+    client = AsyncIOMotorClient(
+        settings.mongo_url,
+        minPoolSize=settings.mongo_min_pool_size,
+        serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+    )
     db = client[settings.mongo_db]
-    print(f"✅ MongoDB connecté: {settings.mongo_db}")
+    try:
+        await ping_db()
+        await create_indexes()
+        print(f"✅ MongoDB connecté: {settings.mongo_db}")
+    except Exception as e:
+        print(f"⚠️ MongoDB injoignable au démarrage: {e!r}")
+
+
+async def create_indexes():
+    """Crée les index (une seule fois par processus)."""
+    global indexes_ready
+    if indexes_ready:
+        return
+    await ensure_indexes(db)
+    await ensure_heatmap_indexes(db)
+    indexes_ready = True
+
+
+async def ping_db():
+    """Commande ping (aucune lecture de collection). Lève une exception si MongoDB est injoignable."""
+    await client.admin.command("ping")
 
 
 async def close_db():
     """Ferme la connexion MongoDB à l'arrêt de l'app."""
+    if client is not None:
+        client.close()
     print("🔌 MongoDB déconnecté")
 
 
@@ -9,6 +9,11 @@ from fastapi import FastAPI
 from strawberry.fastapi import GraphQLRouter
 
 from app.db.mongodb import init_db, close_db
+from app.services.resilience import close_upstreams
+from app.services.ingestion import start_ingestion, stop_ingestion
+from app.services.heatmap import start_heatmap_refresher, stop_heatmap_refresher
+from app.services.health import warm_up, start_health_monitor, stop_health_monitor
+from app.services.diagnostics import profile_middleware, start_lag_monitor, stop_lag_monitor
 from app.api.rest import router as rest_router
 from app.schemas.graphql import schema
 
@@ -18,11 +23,23 @@ async def lifespan(app: FastAPI):
     """
     Gère le cycle de vie de l'application.
     
-    - Au démarrage: connecte MongoDB
-    - À l'arrêt: déconnecte MongoDB
+    - Au démarrage: connecte MongoDB, warm-up (pools MongoDB/HTTP, snapshot
+      de vols), lance les moniteurs (santé, lag de la boucle), le
+      rafraîchissement de la heatmap et l'ingestion
+    - À l'arrêt: rend les baux, ferme les pools HTTP et déconnecte MongoDB
     """
+    start_lag_monitor()
     await init_db()
+    await warm_up()
+    start_health_monitor()
+    start_heatmap_refresher()
+    start_ingestion()
     yield
+    await stop_ingestion()
+    await stop_heatmap_refresher()
+    await stop_health_monitor()
+    await stop_lag_monitor()
+    await close_upstreams()
     await close_db()
 
 
@@ -34,6 +51,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Profiling à la demande (header X-Profile, voir diagnostics.py)
+app.middleware("http")(profile_middleware)
+
 # Ajouter les routes REST (/api/*)
 app.include_router(rest_router)
 
@@ -6,13 +6,17 @@ API GraphQL avec Strawberry.
 Strawberry transforme des classes Python en schema GraphQL automatiquement.
 """
 
-from typing import Optional
+from typing import AsyncGenerator, Optional
 import strawberry
 from bson import ObjectId
 
-from app.services.impact_calculator import calculate_impact
+from app.services.impact_calculator import calculate_impacts
 from app.services.flight_client import get_flights
-from app.services.satellite_client import trigger_satellite_tile
+from app.services.satellite_client import trigger_tile_in_background
+from app.services.impact_store import save_impacts
+from app.services.impact_stream import stream_impacts
+from app.services.resilience import request_deadline
+from app.config import get_settings
 from app.db.mongodb import get_db
 
 
@@ -29,6 +33,23 @@ class Impact:
     description: str
 
 
+@strawberry.type
+class ImpactEvent:
+    """
+    Événement du flux de création d'impacts.
+    
+    - kind = "impact": `impact` est rempli
+    - kind = "summary": `analyzed` et `created` sont remplis (dernier événement)
+    - kind = "error": flux interrompu, `error` est rempli (dernier événement)
+    """
+    kind: str
+    impact: Optional[Impact] = None
+    analyzed: Optional[int] = None
+    created: Optional[int] = None
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
 # ============ HELPER ============
 
 def doc_to_impact(doc: dict) -> Impact:
@@ -82,27 +103,27 @@ class Mutation:
         Flow pour chaque vol:
         1. Récupère les vols depuis flight-service
         2. Calcule l'impact météo
-        3. Sauvegarde en MongoDB
-        4. Déclenche satellite-service
+        3. Sauvegarde en MongoDB (upsert par vol et tranche de temps)
+        4. Déclenche satellite-service si l'impact a changé
         """
-        flights = await get_flights()
-        results = []
+        with request_deadline(get_settings().request_deadline_seconds):
+            flights = await get_flights()
+            impacts = await calculate_impacts(flights[:limit])
         
-        for flight in flights[:limit]:
-            # Calculer l'impact
-            impact = await calculate_impact(flight)
-            
-            # Sauvegarder en MongoDB
-            impact_id = ObjectId()
-            doc = impact.model_dump()
-            doc["_id"] = impact_id
-            await get_db().impact.insert_one(doc)
+        # Sauvegarder en MongoDB (upsert par vol et tranche de temps)
+        saved = await save_impacts(get_db(), impacts)
+        
+        results = []
+        for entry in saved:
+            impact = entry["impact"]
             
-            # Déclencher satellite (après sauvegarde)
-            await trigger_satellite_tile(str(impact_id))
+            # Déclencher satellite si nouveau ou changé (après sauvegarde),
+            # en fond: la réponse reste bornée par le deadline
+            if entry["trigger_tile"]:
+                trigger_tile_in_background(entry["id"])
             
             results.append(Impact(
-                id=str(impact_id),
+                id=entry["id"],
                 flight_id=impact.flight_id,
                 callsign=impact.callsign,
                 severity=impact.severity.value,
@@ -113,6 +134,38 @@ class Mutation:
         return results
 
 
+# ============ SUBSCRIPTIONS (streaming) ============
+
+@strawberry.type
+class Subscription:
+
+    @strawberry.subscription
+    async def create_impacts_stream(self, limit: int = 10) -> AsyncGenerator[ImpactEvent, None]:
+        """
+        Comme createImpacts, mais chaque impact est envoyé dès qu'il est
+        calculé et sauvegardé, puis un événement "summary" (ou "error" si
+        le flux est interrompu) le termine.
+        """
+        async for event in stream_impacts(limit):
+            if event["type"] == "impact":
+                yield ImpactEvent(kind="impact", impact=Impact(
+                    id=event["id"],
+                    flight_id=event["flight_id"],
+                    callsign=event["callsign"],
+                    severity=event["severity"],
+                    impact_score=event["impact_score"],
+                    description=event["description"]
+                ))
+            else:
+                yield ImpactEvent(
+                    kind=event["type"],
+                    analyzed=event["analyzed"],
+                    created=event["created"],
+                    elapsed_ms=event["elapsed_ms"],
+                    error=event.get("error")
+                )
+
+
 # ============ SCHEMA ============
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(query=Query, mutation=Mutation, subscription=Subscription)
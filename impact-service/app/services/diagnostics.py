@@ -0,0 +1,207 @@
+"""
+Diagnostics
+===========
+Outils pour voir le travail synchrone qui bloque la boucle asyncio
+(construction des modèles Pydantic, model_dump, doc_to_dict, ...).
+
+- Moniteur de lag: une tâche asyncio met à jour un "battement" toutes
+  les `loop_lag_interval_ms`. Un thread chien de garde vérifie ce
+  battement: si la boucle est bloquée plus de `loop_lag_threshold_ms`,
+  il capture la pile du thread de la boucle *pendant* le blocage et la
+  logue (une fois par blocage).
+- Profiler par échantillonnage: un thread relève la pile du thread de
+  la boucle toutes les `profile_interval_ms` et écrit les piles au
+  format "folded" (une ligne "f1;f2;f3 N" par pile), directement
+  utilisable par flamegraph.pl ou speedscope.
+
+Le profiler est opt-in: il faut un ADMIN_TOKEN configuré, puis soit le
+header `X-Profile: <token>` sur une requête, soit
+`POST /api/admin/profile?seconds=N`. Un seul profil à la fois.
+"""
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from app.config import get_settings
+
+# Statistiques du moniteur (exposées par GET /api/admin/diagnostics)
+lag_stats = {
+    "max_lag_ms": 0.0,
+    "stalls": 0,
+    "last_stall_at": None,
+}
+
+_heartbeat = 0.0
+_loop_thread_id: Optional[int] = None
+_lag_task: Optional[asyncio.Task] = None
+_watchdog_stop = threading.Event()
+_profile_lock = threading.Lock()
+
+
+# ============ MONITEUR DE LAG ============
+
+async def _heartbeat_loop(interval: float):
+    global _heartbeat
+    while True:
+        before = time.monotonic()
+        _heartbeat = before
+        await asyncio.sleep(interval)
+        lag_ms = (time.monotonic() - before - interval) * 1000
+        lag_stats["max_lag_ms"] = round(max(lag_stats["max_lag_ms"], lag_ms), 1)
+
+
+def _watchdog(threshold: float, interval: float):
+    reported = 0.0  # battement déjà signalé (un log par blocage)
+    while not _watchdog_stop.wait(interval):
+        beat = _heartbeat
+        blocked = time.monotonic() - beat
+        if blocked < threshold or beat == reported:
+            continue
+        frame = sys._current_frames().get(_loop_thread_id)
+        if frame is None:
+            continue
+        reported = beat
+        lag_stats["stalls"] += 1
+        lag_stats["last_stall_at"] = datetime.utcnow().isoformat()
+        stack = "".join(traceback.format_stack(frame))
+        print(f"🐢 Boucle asyncio bloquée depuis {blocked * 1000:.0f} ms:\n{stack}")
+
+
+def start_lag_monitor():
+    """Démarre la tâche de battement et le thread chien de garde."""
+    global _loop_thread_id, _lag_task, _heartbeat
+    settings = get_settings()
+    if settings.loop_lag_threshold_ms <= 0:
+        return
+    interval = settings.loop_lag_interval_ms / 1000
+    _loop_thread_id = threading.get_ident()
+    _heartbeat = time.monotonic()
+    _watchdog_stop.clear()
+    _lag_task = asyncio.create_task(_heartbeat_loop(interval))
+    threading.Thread(
+        target=_watchdog,
+        args=(settings.loop_lag_threshold_ms / 1000, interval),
+        name="loop-watchdog",
+        daemon=True,
+    ).start()
+
+
+async def stop_lag_monitor():
+    _watchdog_stop.set()
+    if _lag_task is not None:
+        _lag_task.cancel()
+        await asyncio.gather(_lag_task, return_exceptions=True)
+
+
+# ============ PROFILER ============
+
+def _folded(frame) -> str:
+    """Pile d'un frame au format folded (racine d'abord)."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class SamplingProfiler:
+    """Échantillonne la pile d'un thread depuis un thread séparé."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_folded(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, name: str) -> str:
+        """Écrit le profil folded dans `profile_dir` et retourne son chemin."""
+        directory = get_settings().profile_dir
+        os.makedirs(directory, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name).strip("_")
+        path = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{safe}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """True si un ADMIN_TOKEN est configuré et que `token` correspond."""
+    expected = get_settings().admin_token
+    if not expected or token is None:
+        return False
+    # Comparaison en temps constant (le token protège le profiling en prod)
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def _start_profiler() -> Optional[SamplingProfiler]:
+    if not _profile_lock.acquire(blocking=False):
+        return None  # un profil est déjà en cours
+    profiler = SamplingProfiler(threading.get_ident(), get_settings().profile_interval_ms / 1000)
+    profiler.start()
+    return profiler
+
+
+def _finish_profiler(profiler: SamplingProfiler, name: str) -> str:
+    try:
+        profiler.stop()
+        return profiler.write(name)
+    finally:
+        _profile_lock.release()
+
+
+async def profile_for(seconds: float) -> Optional[str]:
+    """Profile la boucle pendant `seconds` secondes. None si un profil est déjà en cours."""
+    profiler = _start_profiler()
+    if profiler is None:
+        return None
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        path = _finish_profiler(profiler, f"window-{seconds:g}s")
+    print(f"📈 Profil écrit: {path}")
+    return path
+
+
+async def profile_middleware(request, call_next):
+    """
+    Middleware HTTP: profile la requête si le header X-Profile porte l'ADMIN_TOKEN.
+
+    Note: la boucle est partagée, le profil contient aussi le travail des
+    requêtes concurrentes pendant la même période.
+    """
+    if not is_admin(request.headers.get("X-Profile")):
+        return await call_next(request)
+
+    profiler = _start_profiler()
+    if profiler is None:
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        path = _finish_profiler(profiler, f"{request.method}-{request.url.path}")
+    response.headers["X-Profile-Path"] = path
+    return response
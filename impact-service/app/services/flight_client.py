@@ -2,12 +2,18 @@
 Flight Client
 =============
 Client pour récupérer les vols depuis flight-service.
+
+Les requêtes sont conditionnelles (If-None-Match): tant que flight-service
+sert le même snapshot il répond 304 sans corps, et on réutilise la liste
+déjà convertie au lieu de retélécharger et reparser tout le JSON.
 """
 
 from datetime import datetime
-import httpx
 from app.models.impact import FlightPosition
-from app.config import get_settings
+from app.services.resilience import get_upstream
+
+# Dernière réponse par bounding box: {params: (etag, vols)}
+_last_response: dict[tuple, tuple[str, list[FlightPosition]]] = {}
 
 
 async def get_flights(
@@ -25,9 +31,6 @@ async def get_flights(
     Returns:
         Liste de positions de vol
     """
-    settings = get_settings()
-    url = f"{settings.flight_service_url}/flights"
-    
     # Ajouter les paramètres de bounding box si fournis
     params = {}
     if lamin: params["lamin"] = lamin
@@ -35,11 +38,21 @@ async def get_flights(
     if lamax: params["lamax"] = lamax
     if lomax: params["lomax"] = lomax
     
+    key = tuple(sorted(params.items()))
+    cached = _last_response.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await get_upstream("flight").request(
+            "GET", "/flights", params=params, headers=headers
+        )
+        
+        # Snapshot inchangé: on réutilise le résultat déjà parsé
+        if response.status_code == 304 and cached:
+            return list(cached[1])
+        
+        response.raise_for_status()
+        data = response.json()
         
         # Convertir en FlightPosition
         # Le flight-service retourne un array directement
@@ -60,7 +73,11 @@ async def get_flights(
                 timestamp=datetime.utcnow()
             ))
         
-        return flights
+        etag = response.headers.get("ETag")
+        if etag:
+            _last_response[key] = (etag, flights)
+        
+        return list(flights)
         
     except Exception as e:
         print(f"⚠️ Erreur flight-service: {e}")
@@ -0,0 +1,60 @@
+"""
+Geo Helpers
+===========
+Petites fonctions géographiques partagées par les services.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance orthodromique (grand cercle) en km entre deux points."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ============ QUADKEYS ============
+# Grille hiérarchique (tuiles Web Mercator, comme Bing Maps):
+# chaque caractère du quadkey (0-3) descend d'un niveau de zoom,
+# donc la cellule parente d'un quadkey est simplement son préfixe.
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def quadkey(lat: float, lon: float, zoom: int) -> str:
+    """Quadkey de la tuile contenant (lat, lon) au niveau `zoom`."""
+    lat = min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    lon = min(max(lon, -180.0), 180.0)
+    n = 1 << zoom
+    sin_lat = math.sin(math.radians(lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * n)
+    x = min(max(x, 0), n - 1)
+    y = min(max(y, 0), n - 1)
+
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digit = (1 if x & mask else 0) + (2 if y & mask else 0)
+        digits.append(str(digit))
+    return "".join(digits)
+
+
+def quadkey_bbox(key: str) -> tuple[float, float, float, float]:
+    """Retourne (lat_min, lon_min, lat_max, lon_max) d'un quadkey."""
+    x = y = 0
+    for char in key:
+        x = (x << 1) | (int(char) & 1)
+        y = (y << 1) | (int(char) >> 1)
+    n = 1 << len(key)
+
+    def tile_lat(ty: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return tile_lat(y + 1), x / n * 360.0 - 180.0, tile_lat(y), (x + 1) / n * 360.0 - 180.0
@@ -0,0 +1,105 @@
+"""
+Health
+======
+Warm-up au démarrage et état de santé mis en cache pour les probes.
+
+- warm_up(): ouvre le pool MongoDB, pré-connecte les pools HTTP vers les
+  services amont et pré-charge un snapshot de vols, pour que les
+  premières vraies requêtes ne paient pas l'établissement des connexions.
+- Un moniteur en tâche de fond ping MongoDB toutes les
+  `health_check_interval_seconds` et met à jour `status`.
+- Les probes (liveness / readiness) lisent seulement `status`: elles
+  n'ajoutent aucune charge sur MongoDB, quelle que soit leur fréquence.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from app.config import get_settings
+from app.db import mongodb
+from app.services.flight_client import get_flights
+from app.services.resilience import get_upstream
+
+status = {
+    "ready": False,
+    "mongo": False,
+    "warmed_up": False,
+    "checked_at": None,
+    "warmup": {},
+}
+
+_monitor: Optional[asyncio.Task] = None
+
+
+async def _check_mongo() -> bool:
+    try:
+        await mongodb.ping_db()
+        await mongodb.create_indexes()
+        ok = True
+    except Exception as e:
+        if status["mongo"]:
+            print(f"⚠️ MongoDB injoignable: {e!r}")
+        ok = False
+    status["mongo"] = ok
+    status["ready"] = ok and status["warmed_up"]
+    status["checked_at"] = datetime.utcnow().isoformat()
+    return ok
+
+
+async def _preconnect(name: str, path: str) -> bool:
+    """Ouvre une connexion vers un amont (le code HTTP importe peu)."""
+    try:
+        await get_upstream(name).client.get(path)
+        return True
+    except Exception as e:
+        print(f"⚠️ Warm-up {name}: {e!r}")
+        return False
+
+
+async def warm_up():
+    """Phase de warm-up du démarrage, bornée par `warmup_timeout_seconds`."""
+    settings = get_settings()
+    steps = {"mongo": _check_mongo()}
+
+    async def prefetch_flights() -> bool:
+        return bool(await get_flights())
+
+    steps["flights"] = prefetch_flights()
+    if not settings.use_mock_weather:
+        steps["weather"] = _preconnect("weather", "/healthz")
+    if not settings.use_mock_satellite:
+        steps["satellite"] = _preconnect("satellite", "/satellites")
+
+    names = list(steps)
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*steps.values(), return_exceptions=True),
+            settings.warmup_timeout_seconds,
+        )
+    except asyncio.TimeoutError:
+        results = [False] * len(names)
+        print(f"⚠️ Warm-up incomplet après {settings.warmup_timeout_seconds}s")
+
+    status["warmup"] = {name: result is True for name, result in zip(names, results)}
+    status["warmed_up"] = True
+    status["ready"] = status["mongo"]
+    print(f"🔥 Warm-up terminé: {status['warmup']}")
+
+
+async def _monitor_loop():
+    settings = get_settings()
+    while True:
+        await asyncio.sleep(settings.health_check_interval_seconds)
+        await _check_mongo()
+
+
+def start_health_monitor():
+    global _monitor
+    _monitor = asyncio.create_task(_monitor_loop())
+
+
+async def stop_health_monitor():
+    if _monitor is not None:
+        _monitor.cancel()
+        await asyncio.gather(_monitor, return_exceptions=True)
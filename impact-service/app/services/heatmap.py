@@ -0,0 +1,227 @@
+"""
+Heatmap
+=======
+Carte de chaleur des impacts sur une grille hiérarchique (quadkeys).
+
+Chaque impact stocke le quadkey de sa position au zoom HEATMAP_MAX_ZOOM
+(voir impact_store). On précalcule des tuiles par tranche de temps
+(bucket) et par niveau de zoom dans la collection `impact_heatmap`:
+
+    {bucket, zoom, quadkey, count, max_score, hazards: {type: nombre}}
+
+Rafraîchissement incrémental, en tâche de fond toutes les
+`heatmap_refresh_seconds`: on ne recalcule que les tranches dont des
+impacts ont été modifiés depuis le dernier passage (champ updated_at).
+Les réponses de l'endpoint sont gardées en cache mémoire entre deux
+rafraîchissements: afficher la carte ne déclenche jamais de scan de
+`impact` ni de recalcul.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ASCENDING, ReplaceOne
+
+from app.config import get_settings
+from app.services.geo import quadkey_bbox
+
+# Niveaux précalculés (le plus fin doit être HEATMAP_MAX_ZOOM)
+HEATMAP_ZOOMS = (2, 4, 6, 8, 10)
+HEATMAP_MAX_ZOOM = HEATMAP_ZOOMS[-1]
+
+# Marge de sécurité: un impact écrit en même temps que le rafraîchissement
+# peut avoir un updated_at légèrement antérieur au max lu
+_WATERMARK_MARGIN = timedelta(seconds=5)
+
+_refresh_lock = asyncio.Lock()
+_refresher: Optional[asyncio.Task] = None
+_cache: dict[tuple[int, int], tuple[float, dict]] = {}
+
+
+async def ensure_heatmap_indexes(db) -> None:
+    """Index utilisés par le rafraîchissement et la lecture des tuiles."""
+    await db.impact.create_index([("updated_at", ASCENDING)], name="updated_at")
+    await db.impact.create_index([("bucket", ASCENDING)], name="bucket")
+    await db.impact_heatmap.create_index(
+        [("zoom", ASCENDING), ("bucket", ASCENDING)], name="zoom_bucket"
+    )
+
+
+def _current_bucket() -> int:
+    return int(time.time()) // get_settings().impact_bucket_seconds
+
+
+async def _rebuild_bucket(db, bucket: int) -> int:
+    """Recalcule toutes les tuiles (tous zooms) d'une tranche de temps."""
+    pipeline = [
+        {"$match": {"bucket": bucket, "quadkey": {"$exists": True}}},
+        {"$group": {
+            "_id": "$quadkey",
+            "count": {"$sum": 1},
+            "max_score": {"$max": "$impact_score"},
+            "hazards": {"$push": "$weather_risk.hazards.type"},
+        }},
+    ]
+    finest = [cell async for cell in db.impact.aggregate(pipeline)]
+
+    # Agrégation vers les niveaux plus grossiers: parent = préfixe du quadkey
+    tiles: dict[tuple[int, str], dict] = {}
+    for cell in finest:
+        hazards = Counter(h for types in cell["hazards"] if types for h in types)
+        for zoom in HEATMAP_ZOOMS:
+            key = (zoom, cell["_id"][:zoom])
+            tile = tiles.setdefault(key, {"count": 0, "max_score": 0.0, "hazards": Counter()})
+            tile["count"] += cell["count"]
+            tile["max_score"] = max(tile["max_score"], cell["max_score"] or 0.0)
+            tile["hazards"].update(hazards)
+
+    docs = [
+        {
+            "_id": f"{bucket}:{zoom}:{key}",
+            "bucket": bucket,
+            "zoom": zoom,
+            "quadkey": key,
+            "count": tile["count"],
+            "max_score": tile["max_score"],
+            "hazards": dict(tile["hazards"]),
+        }
+        for (zoom, key), tile in tiles.items()
+    ]
+    # Remplacement en place (pas de trou visible par les lecteurs) et
+    # idempotent: deux réplicas peuvent recalculer la même tranche
+    if docs:
+        await db.impact_heatmap.bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs],
+            ordered=False,
+        )
+    # Cellules qui n'existent plus dans la tranche
+    await db.impact_heatmap.delete_many(
+        {"bucket": bucket, "_id": {"$nin": [doc["_id"] for doc in docs]}}
+    )
+    return len(docs)
+
+
+async def refresh_heatmap(db) -> int:
+    """
+    Recalcule les tranches modifiées depuis le dernier rafraîchissement.
+
+    La marge du watermark fait relire les derniers impacts à chaque
+    passage. Pour ne pas recalculer les mêmes tranches en boucle quand
+    il n'y a plus d'écritures, on garde pour chaque tranche relue une
+    signature (updated_at max, nombre d'impacts relus): une tranche n'est
+    recalculée que si sa signature a changé.
+
+    Returns:
+        Nombre de tranches recalculées
+    """
+    settings = get_settings()
+
+    async with _refresh_lock:
+        state = await db.impact_heatmap_state.find_one({"_id": "watermark"}) or {}
+        oldest = _current_bucket() - settings.heatmap_max_hours * 3600 // settings.impact_bucket_seconds
+
+        match = {"bucket": {"$gte": oldest}}
+        if state.get("updated_at"):
+            match["updated_at"] = {"$gt": state["updated_at"]}
+        recent = [
+            doc async for doc in db.impact.aggregate([
+                {"$match": match},
+                {"$group": {
+                    "_id": "$bucket",
+                    "updated_at": {"$max": "$updated_at"},
+                    "count": {"$sum": 1},
+                }},
+            ])
+        ]
+
+        signatures = {str(doc["_id"]): [doc["updated_at"], doc["count"]] for doc in recent}
+        previous = state.get("signatures", {})
+        changed = [doc for doc in recent if previous.get(str(doc["_id"])) != signatures[str(doc["_id"])]]
+
+        for doc in changed:
+            await _rebuild_bucket(db, doc["_id"])
+
+        if changed:
+            watermark = max(doc["updated_at"] for doc in recent) - _WATERMARK_MARGIN
+            update = {"signatures": signatures}
+            if not state.get("updated_at") or watermark > state["updated_at"]:
+                update["updated_at"] = watermark
+            await db.impact_heatmap_state.update_one(
+                {"_id": "watermark"}, {"$set": update}, upsert=True
+            )
+            # Purge des tuiles trop anciennes
+            await db.impact_heatmap.delete_many({"bucket": {"$lt": oldest}})
+            _cache.clear()
+
+        return len(changed)
+
+
+async def _refresh_loop():
+    # Import local: mongodb importe les index de ce module
+    from app.db.mongodb import get_db
+
+    settings = get_settings()
+    while True:
+        try:
+            await refresh_heatmap(get_db())
+        except Exception as e:
+            print(f"⚠️ Heatmap: rafraîchissement en échec: {e!r}")
+        await asyncio.sleep(settings.heatmap_refresh_seconds)
+
+
+def start_heatmap_refresher():
+    """Rafraîchit les tuiles en tâche de fond (jamais pendant une requête)."""
+    global _refresher
+    _refresher = asyncio.create_task(_refresh_loop())
+
+
+async def stop_heatmap_refresher():
+    if _refresher is not None:
+        _refresher.cancel()
+        await asyncio.gather(_refresher, return_exceptions=True)
+
+
+async def get_heatmap(db, zoom: int, hours: int) -> dict:
+    """
+    Carte de chaleur agrégée sur les `hours` dernières heures.
+
+    Lit les tuiles précalculées (voir start_heatmap_refresher) et sert la
+    réponse depuis le cache mémoire entre deux rafraîchissements.
+    """
+    settings = get_settings()
+    cached = _cache.get((zoom, hours))
+    if cached and time.monotonic() - cached[0] < settings.heatmap_refresh_seconds:
+        return cached[1]
+
+    since = _current_bucket() - hours * 3600 // settings.impact_bucket_seconds
+    cells: dict[str, dict] = {}
+    async for tile in db.impact_heatmap.find({"zoom": zoom, "bucket": {"$gte": since}}):
+        cell = cells.setdefault(tile["quadkey"], {"count": 0, "max_score": 0.0, "hazards": Counter()})
+        cell["count"] += tile["count"]
+        cell["max_score"] = max(cell["max_score"], tile["max_score"])
+        cell["hazards"].update(tile["hazards"])
+
+    result_cells = []
+    for key, cell in cells.items():
+        lat_min, lon_min, lat_max, lon_max = quadkey_bbox(key)
+        dominant = cell["hazards"].most_common(1)
+        result_cells.append({
+            "quadkey": key,
+            "bbox": [lat_min, lon_min, lat_max, lon_max],
+            "count": cell["count"],
+            "max_score": cell["max_score"],
+            "dominant_hazard": dominant[0][0] if dominant else None,
+        })
+    result_cells.sort(key=lambda c: c["count"], reverse=True)
+
+    result = {
+        "zoom": zoom,
+        "hours": hours,
+        "generated_at": datetime.utcnow().isoformat(),
+        "cells": result_cells,
+    }
+    _cache[(zoom, hours)] = (time.monotonic(), result)
+    return result
@@ -7,8 +7,8 @@ Note: Le satellite-service est appelé APRÈS la création de l'impact,
 pas dans ce module. Voir rest.py et graphql.py.
 """
 
-from app.models.impact import Impact, ImpactSeverity, FlightPosition
-from app.services.weather_client import get_weather_risk
+from app.models.impact import Impact, ImpactSeverity, FlightPosition, WeatherRisk
+from app.services.weather_client import get_weather_risk, get_weather_risks
 
 
 async def calculate_impact(position: FlightPosition) -> Impact:
@@ -29,6 +29,22 @@ async def calculate_impact(position: FlightPosition) -> Impact:
     
     # 1. Récupérer les données météo
     weather = await get_weather_risk(position.latitude, position.longitude, position.altitude)
+    return build_impact(position, weather)
+
+
+async def calculate_impacts(positions: list[FlightPosition], concurrency: int = 1) -> list[Impact]:
+    """
+    Calcule l'impact météo de plusieurs vols (même ordre).
+    
+    La météo est récupérée en lot (vectorisée en mode synthétique),
+    puis chaque impact est construit comme dans calculate_impact.
+    """
+    weathers = await get_weather_risks(positions, concurrency=concurrency)
+    return [build_impact(position, weather) for position, weather in zip(positions, weathers)]
+
+
+def build_impact(position: FlightPosition, weather: WeatherRisk) -> Impact:
+    """Calcule score, sévérité et recommandations à partir de la météo."""
     
     # 2. Calculer le score d'impact (0-100)
     #    - 70% basé sur le score météo global
@@ -0,0 +1,210 @@
+"""
+Impact Store
+============
+Écriture idempotente des impacts en MongoDB.
+
+Un impact est identifié par (flight_id, bucket), où bucket est la tranche
+temporelle de `impact_bucket_seconds` secondes où le vol a été observé.
+Ré-analyser un vol dans la même tranche met à jour le document existant
+au lieu d'en insérer un nouveau.
+
+On indique aussi pour chaque impact s'il faut (re)déclencher une tuile
+satellite: uniquement pour un nouvel impact, ou si la position a bougé
+de plus de `tile_min_distance_km` ou si la sévérité a changé depuis la
+dernière tuile demandée (champ `tile` du document).
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import get_settings
+from app.models.impact import Impact
+from app.services.geo import haversine_km, quadkey
+from app.services.heatmap import HEATMAP_MAX_ZOOM
+
+
+def time_bucket(ts: datetime) -> int:
+    """Retourne la tranche temporelle (entier) d'un datetime UTC naïf ou aware."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp()) // get_settings().impact_bucket_seconds
+
+
+async def ensure_indexes(db) -> None:
+    """Crée l'index unique (flight_id, bucket) utilisé par les upserts."""
+    await db.impact.create_index(
+        [("flight_id", ASCENDING), ("bucket", ASCENDING)],
+        unique=True,
+        name="flight_bucket_unique",
+        # Les anciens documents (sans bucket) ne sont pas concernés
+        partialFilterExpression={"bucket": {"$exists": True}},
+    )
+
+
+def _impact_key(doc: dict) -> tuple:
+    """
+    Clé (flight_id, bucket) d'un impact (dict issu de model_dump).
+
+    La tranche de temps vient de l'heure d'observation du vol
+    (position.timestamp), pas de l'heure de calcul: un backfill range
+    donc les impacts dans la tranche où le vol a été vu.
+    """
+    return doc["flight_id"], time_bucket(doc["position"]["timestamp"])
+
+
+def _upsert_operation(
+    doc: dict, now: datetime, tile: Optional[dict] = None
+) -> tuple[UpdateOne, tuple, ObjectId]:
+    """
+    Construit l'upsert d'un impact (dict issu de model_dump).
+
+    Args:
+        tile: position et sévérité de la tuile satellite demandée pour cet
+            impact, None si aucune tuile n'est demandée (champ conservé)
+    """
+    doc = dict(doc)
+    created_at = doc.pop("created_at")
+    key = _impact_key(doc)
+    doc["bucket"] = key[1]
+    doc["updated_at"] = now
+    # Cellule de la heatmap (les zooms plus grossiers sont des préfixes)
+    doc["quadkey"] = quadkey(
+        doc["position"]["latitude"], doc["position"]["longitude"], HEATMAP_MAX_ZOOM
+    )
+    if tile is not None:
+        doc["tile"] = tile
+    new_id = ObjectId()
+    operation = UpdateOne(
+        {"flight_id": key[0], "bucket": key[1]},
+        {"$set": doc, "$setOnInsert": {"_id": new_id, "created_at": created_at}},
+        upsert=True,
+    )
+    return operation, key, new_id
+
+
+def _tile_reference(impact: Impact) -> dict:
+    """Ce qui est mémorisé au moment où une tuile est demandée."""
+    return {
+        "latitude": impact.position.latitude,
+        "longitude": impact.position.longitude,
+        "severity": impact.severity.value,
+    }
+
+
+def _needs_tile(previous: dict, impact: Impact) -> bool:
+    """
+    True si la position ou la sévérité a changé de façon significative
+    depuis la dernière tuile demandée.
+
+    On compare à la tuile et non à la dernière analyse: sinon un vol qui
+    bouge un peu à chaque analyse n'atteindrait jamais le seuil.
+    """
+    settings = get_settings()
+    # Documents antérieurs au champ `tile`: dernière analyse
+    position = previous.get("tile") or previous.get("position") or {}
+    severity = (previous.get("tile") or previous).get("severity")
+    if severity != impact.severity.value:
+        return True
+    if position.get("latitude") is None or position.get("longitude") is None:
+        return True
+    moved_km = haversine_km(
+        position["latitude"], position["longitude"],
+        impact.position.latitude, impact.position.longitude,
+    )
+    return moved_km >= settings.tile_min_distance_km
+
+
+async def save_impacts(db, impacts: list[Impact]) -> list[dict]:
+    """
+    Sauvegarde une liste d'impacts avec un seul bulk_write d'upserts.
+
+    Returns:
+        Une entrée par impact (même ordre): {"id", "impact", "created", "trigger_tile"}
+    """
+    if not impacts:
+        return []
+
+    now = datetime.utcnow()
+    dumped = [impact.model_dump() for impact in impacts]
+    keys = [_impact_key(doc) for doc in dumped]
+
+    # 1. Charger les documents existants pour ces clés (une seule requête)
+    cursor = db.impact.find(
+        {"$or": [{"flight_id": f, "bucket": b} for f, b in set(keys)]},
+        projection={"flight_id": 1, "bucket": 1, "severity": 1, "position": 1, "tile": 1},
+    )
+    existing = {(doc["flight_id"], doc["bucket"]): doc async for doc in cursor}
+
+    # 2. Décider pour chaque impact: nouveau ou mise à jour, tuile ou pas
+    entries = []
+    operations = []
+    seen = {}
+    for impact, doc, key in zip(impacts, dumped, keys):
+        previous = seen.get(key) or existing.get(key)
+        trigger_tile = previous is None or _needs_tile(previous, impact)
+        tile = _tile_reference(impact) if trigger_tile else None
+        operation, _, new_id = _upsert_operation(doc, now, tile)
+        operations.append(operation)
+        entries.append({
+            "id": str(previous["_id"]) if previous else str(new_id),
+            "impact": impact,
+            "created": previous is None,
+            "trigger_tile": trigger_tile,
+        })
+        # Un même vol deux fois dans le lot: le 2e met à jour le 1er
+        seen[key] = {
+            "_id": previous["_id"] if previous else new_id,
+            "severity": impact.severity.value,
+            "position": impact.position.model_dump(),
+            "tile": tile or (previous or {}).get("tile"),
+        }
+
+    # 3. Écrire en un seul aller-retour
+    await db.impact.bulk_write(operations, ordered=True)
+
+    # Un autre réplica a pu insérer la clé entre la lecture et l'écriture:
+    # on relit les ids réellement stockés pour les impacts "créés".
+    created_keys = [key for key, entry in zip(keys, entries) if entry["created"]]
+    if created_keys:
+        cursor = db.impact.find(
+            {"$or": [{"flight_id": f, "bucket": b} for f, b in set(created_keys)]},
+            projection={"flight_id": 1, "bucket": 1},
+        )
+        stored = {(doc["flight_id"], doc["bucket"]): str(doc["_id"]) async for doc in cursor}
+        for key, entry in zip(keys, entries):
+            if entry["created"] and key in stored and stored[key] != entry["id"]:
+                entry["id"] = stored[key]
+                entry["created"] = False
+
+    return entries
+
+
+async def bulk_upsert_docs(db, docs: list[dict]) -> int:
+    """
+    Upsert en masse sans relecture (backfill): pas de suivi des tuiles.
+
+    Args:
+        docs: impacts sous forme de dict (Impact.model_dump())
+
+    Returns:
+        Nombre de documents insérés ou modifiés (un par clé du lot)
+    """
+    if not docs:
+        return 0
+
+    # Un lot contient plusieurs observations d'un même vol dans la même
+    # tranche (snapshots ~60s, tranches de 300s): on ne garde que la plus
+    # récente, sinon l'ordre non garanti de ordered=False décide
+    latest: dict[tuple, dict] = {}
+    for doc in docs:
+        key = _impact_key(doc)
+        kept = latest.get(key)
+        if kept is None or doc["position"]["timestamp"] >= kept["position"]["timestamp"]:
+            latest[key] = doc
+
+    now = datetime.utcnow()
+    operations = [_upsert_operation(doc, now)[0] for doc in latest.values()]
+    result = await db.impact.bulk_write(operations, ordered=False)
+    return result.upserted_count + result.modified_count
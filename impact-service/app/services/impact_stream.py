@@ -0,0 +1,128 @@
+"""
+Impact Stream
+=============
+Variante "streaming" de la création d'impacts.
+
+POST /api/impacts attend que tous les vols soient analysés avant de
+répondre. Ici chaque impact est émis dès qu'il est calculé et
+sauvegardé: le premier résultat arrive après la latence d'un seul vol,
+pas après le vol le plus lent du lot. Un événement "summary" termine
+le flux, ou un événement "error" s'il a été interrompu.
+
+Utilisé par REST (NDJSON / SSE) et par la subscription GraphQL.
+"""
+
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncIterator
+
+from app.config import get_settings
+from app.db.mongodb import get_db
+from app.models.impact import FlightPosition
+from app.services.flight_client import get_flights
+from app.services.impact_calculator import calculate_impact, calculate_impacts
+from app.services.impact_store import save_impacts
+from app.services.resilience import request_deadline
+from app.services.satellite_client import trigger_tile_in_background
+
+
+def _start_scoring(flights: list[FlightPosition]) -> list[asyncio.Task]:
+    """
+    Lance le calcul des impacts. Chaque tâche renvoie une liste d'impacts.
+
+    Les tâches copient le contexte courant: elles héritent du deadline de
+    la requête sans que le générateur le garde ouvert entre deux yield.
+    """
+    settings = get_settings()
+
+    # Mode synthétique: tout le lot en une passe vectorisée, déjà instantané
+    if settings.use_mock_weather and settings.mock_weather_mode == "synthetic":
+        return [asyncio.create_task(calculate_impacts(flights))]
+
+    semaphore = asyncio.Semaphore(settings.stream_concurrency)
+
+    async def score(flight: FlightPosition):
+        async with semaphore:
+            return [await calculate_impact(flight)]
+
+    return [asyncio.create_task(score(flight)) for flight in flights]
+
+
+async def _as_ready(tasks: list[asyncio.Task]) -> AsyncIterator:
+    """Impacts dans l'ordre où ils sont prêts (pas dans l'ordre des vols)."""
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for impact in await next_done:
+                yield impact
+    finally:
+        # Client déconnecté: on n'attend pas les vols restants
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_impacts(limit: int) -> AsyncIterator[dict]:
+    """
+    Analyse les vols et émet un événement par impact, puis un résumé.
+
+    Événements:
+        {"type": "impact", "id", "flight_id", "callsign", "severity", "impact_score", "created"}
+        {"type": "summary", "analyzed", "created", "elapsed_ms", "first_result_ms"}
+        {"type": "error", "error", "analyzed", "created", "elapsed_ms"} (remplace le résumé)
+    """
+    started = time.monotonic()
+    first_result_ms = None
+    analyzed = 0
+    created = 0
+
+    try:
+        # Le deadline n'entoure que du code sans yield: un générateur peut être
+        # repris dans un autre contexte (subscriptions GraphQL)
+        with request_deadline(get_settings().request_deadline_seconds):
+            flights = await get_flights()
+            tasks = _start_scoring(flights[:limit])
+
+        # aclosing: les calculs restants sont annulés dès une erreur
+        async with aclosing(_as_ready(tasks)) as ready:
+            async for impact in ready:
+                # Sauvegarde immédiate (même upsert idempotent que POST /api/impacts)
+                entry = (await save_impacts(get_db(), [impact]))[0]
+                if entry["trigger_tile"]:
+                    trigger_tile_in_background(entry["id"])
+
+                analyzed += 1
+                if entry["created"]:
+                    created += 1
+                if first_result_ms is None:
+                    first_result_ms = round((time.monotonic() - started) * 1000, 1)
+
+                yield {
+                    "type": "impact",
+                    "id": entry["id"],
+                    "flight_id": impact.flight_id,
+                    "callsign": impact.callsign,
+                    "severity": impact.severity.value,
+                    "impact_score": impact.impact_score,
+                    "description": impact.description,
+                    "created": entry["created"],
+                }
+    except Exception as e:
+        # La réponse est déjà en 200: le client doit pouvoir distinguer un
+        # flux interrompu d'un flux complet
+        print(f"⚠️ Flux d'impacts interrompu: {e!r}")
+        yield {
+            "type": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "analyzed": analyzed,
+            "created": created,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        return
+
+    yield {
+        "type": "summary",
+        "analyzed": analyzed,
+        "created": created,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        "first_result_ms": first_result_ms,
+    }
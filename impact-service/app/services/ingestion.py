@@ -0,0 +1,223 @@
+"""
+Ingestion
+=========
+Ingestion coordonnée entre plusieurs réplicas d'impact-service.
+
+Sans coordination, chaque réplica analyse tous les vols: les appels
+weather et les écritures sont multipliés par le nombre de réplicas.
+Ici l'espace est découpé en `ingestion_shards` bandes de longitude.
+Chaque réplica prend des baux (leases) sur des bandes dans MongoDB:
+
+- collection `ingestion_replicas`: un document par réplica vivant
+  (heartbeat), pour connaître le nombre de réplicas;
+- collection `ingestion_leases`: un document par bande
+  {_id: numéro, owner, expires_at}.
+
+Toutes les `lease_heartbeat_seconds`, un réplica renouvelle ses baux,
+prend les bandes libres ou expirées (réplica mort) jusqu'à sa part
+équitable, et rend celles en trop quand un nouveau réplica arrive.
+Toutes les `ingestion_interval_seconds`, il analyse uniquement les vols
+de ses bandes.
+"""
+
+import asyncio
+import math
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.db.mongodb import get_db
+from app.services.flight_client import get_flights
+from app.services.impact_calculator import calculate_impacts
+from app.services.impact_store import save_impacts
+from app.services.resilience import request_deadline
+from app.services.satellite_client import trigger_satellite_tile
+
+# État du réplica courant (exposé par GET /api/ingestion)
+status = {
+    "replica_id": None,
+    "shards": [],
+    "last_cycle_at": None,
+    "last_cycle_flights": 0,
+    "last_cycle_seconds": None,
+}
+
+_tasks: list[asyncio.Task] = []
+_leases_ready = asyncio.Event()
+
+
+def replica_id() -> str:
+    """Identifiant du réplica (REPLICA_ID ou hostname:pid)."""
+    return get_settings().replica_id or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def shard_of(lon: float, shards: int) -> int:
+    """Bande de longitude d'une position (0 .. shards-1)."""
+    shard = int((lon + 180.0) / (360.0 / shards))
+    return min(max(shard, 0), shards - 1)
+
+
+# ============ BAUX ============
+
+async def _heartbeat(db, me: str, now: datetime, ttl: timedelta):
+    await db.ingestion_replicas.update_one(
+        {"_id": me}, {"$set": {"expires_at": now + ttl}}, upsert=True
+    )
+    await db.ingestion_leases.update_many(
+        {"owner": me}, {"$set": {"expires_at": now + ttl}}
+    )
+
+
+async def _try_claim(db, shard: int, me: str, now: datetime, ttl: timedelta) -> bool:
+    """Prend le bail d'une bande si elle est libre ou expirée."""
+    try:
+        doc = await db.ingestion_leases.find_one_and_update(
+            {"_id": shard, "$or": [{"owner": me}, {"owner": None}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": me, "expires_at": now + ttl}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Le document existe et appartient à un autre réplica vivant
+        return False
+    if doc and doc.get("owner") not in (None, me):
+        print(f"🔁 Bande {shard} reprise au réplica {doc['owner']} (bail expiré)")
+    return True
+
+
+async def rebalance(db) -> list[int]:
+    """
+    Renouvelle les baux et ajuste les bandes détenues à la part équitable.
+
+    Returns:
+        Liste triée des bandes détenues par ce réplica
+    """
+    settings = get_settings()
+    me = replica_id()
+    now = datetime.utcnow()
+    ttl = timedelta(seconds=settings.lease_ttl_seconds)
+
+    await _heartbeat(db, me, now, ttl)
+
+    replicas = await db.ingestion_replicas.count_documents({"expires_at": {"$gte": now}})
+    target = math.ceil(settings.ingestion_shards / max(replicas, 1))
+
+    owned = sorted([
+        doc["_id"] async for doc in db.ingestion_leases.find(
+            {"owner": me, "expires_at": {"$gte": now}}, projection={"_id": 1}
+        )
+    ])
+
+    # Rendre les bandes en trop (un nouveau réplica est arrivé)
+    while len(owned) > target:
+        shard = owned.pop()
+        await db.ingestion_leases.update_one(
+            {"_id": shard, "owner": me}, {"$set": {"owner": None, "expires_at": now}}
+        )
+
+    # Prendre des bandes libres ou expirées jusqu'à la part équitable
+    if len(owned) < target:
+        for shard in range(settings.ingestion_shards):
+            if len(owned) >= target:
+                break
+            if shard not in owned and await _try_claim(db, shard, me, now, ttl):
+                owned.append(shard)
+
+    status["shards"] = sorted(owned)
+    return status["shards"]
+
+
+async def release_all(db):
+    """Rend tous les baux du réplica (arrêt propre): reprise immédiate par les autres."""
+    me = replica_id()
+    now = datetime.utcnow()
+    await db.ingestion_leases.update_many({"owner": me}, {"$set": {"owner": None, "expires_at": now}})
+    await db.ingestion_replicas.delete_one({"_id": me})
+
+
+# ============ INGESTION ============
+
+async def ingest_shards(shards: list[int]) -> int:
+    """Analyse et sauvegarde les vols des bandes données. Retourne le nombre de vols."""
+    settings = get_settings()
+    if not shards:
+        return 0
+
+    wanted = set(shards)
+    with request_deadline(settings.ingestion_interval_seconds):
+        flights = [
+            f for f in await get_flights()
+            if shard_of(f.longitude, settings.ingestion_shards) in wanted
+        ]
+        impacts = await calculate_impacts(flights, concurrency=settings.ingestion_concurrency)
+
+    saved = await save_impacts(get_db(), impacts)
+
+    # Tuiles bornées comme les appels weather (pool HTTP et circuit satellite)
+    semaphore = asyncio.Semaphore(settings.ingestion_concurrency)
+
+    async def trigger(impact_id: str):
+        async with semaphore:
+            await trigger_satellite_tile(impact_id)
+
+    await asyncio.gather(*(
+        trigger(entry["id"]) for entry in saved if entry["trigger_tile"]
+    ))
+    return len(saved)
+
+
+async def _lease_loop():
+    settings = get_settings()
+    while True:
+        try:
+            await rebalance(get_db())
+            _leases_ready.set()
+        except Exception as e:
+            print(f"⚠️ Ingestion: erreur de bail: {e!r}")
+        await asyncio.sleep(settings.lease_heartbeat_seconds)
+
+
+async def _ingest_loop():
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    await _leases_ready.wait()
+    while True:
+        started = loop.time()
+        try:
+            count = await ingest_shards(list(status["shards"]))
+            status["last_cycle_at"] = datetime.utcnow().isoformat()
+            status["last_cycle_flights"] = count
+            status["last_cycle_seconds"] = round(loop.time() - started, 3)
+        except Exception as e:
+            print(f"⚠️ Ingestion: cycle en échec: {e!r}")
+        await asyncio.sleep(max(0.0, settings.ingestion_interval_seconds - (loop.time() - started)))
+
+
+def start_ingestion() -> Optional[list[asyncio.Task]]:
+    """Démarre les boucles de bail et d'ingestion (si INGESTION_ENABLED)."""
+    if not get_settings().ingestion_enabled:
+        return None
+    status["replica_id"] = replica_id()
+    _tasks.extend([
+        asyncio.create_task(_lease_loop()),
+        asyncio.create_task(_ingest_loop()),
+    ])
+    print(f"🧭 Ingestion coordonnée démarrée (réplica {status['replica_id']})")
+    return _tasks
+
+
+async def stop_ingestion():
+    """Arrête les boucles et rend les baux."""
+    if not _tasks:
+        return
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    try:
+        await release_all(get_db())
+    except Exception as e:
+        print(f"⚠️ Ingestion: impossible de rendre les baux: {e!r}")
@@ -0,0 +1,275 @@
+"""
+Resilience
+==========
+Couche commune aux clients HTTP (flight, weather, satellite).
+
+- Deadline: chaque requête entrante a un budget global. Chaque appel amont
+  utilise min(timeout de l'amont, temps restant) et échoue tout de suite
+  si le budget est épuisé.
+- Circuit breaker: un par service amont. Après N échecs consécutifs on
+  "ouvre" le circuit et on échoue immédiatement pendant `reset` secondes,
+  puis on laisse passer un seul appel de test (half-open).
+- Hedging: pour les GET idempotents (weather), si la réponse tarde plus
+  de `hedge_after` secondes on envoie une 2e requête identique et on
+  garde la première qui répond.
+
+Les clients httpx sont partagés par amont (pool de connexions réutilisé).
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+from app.config import get_settings
+
+
+class UpstreamError(Exception):
+    """Erreur de base de la couche de résilience."""
+
+
+class CircuitOpenError(UpstreamError):
+    """Le circuit de l'amont est ouvert: on n'essaie même pas."""
+
+
+class DeadlineExceeded(UpstreamError):
+    """Le budget de temps de la requête est épuisé."""
+
+
+# ============ DEADLINE ============
+
+# Instant (time.monotonic) limite de la requête en cours, None = pas de limite
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """
+    Fixe un budget global pour tous les appels amont faits dans ce bloc.
+
+    Un deadline déjà plus court (bloc englobant) est conservé.
+    """
+    limit = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        limit = min(limit, current)
+    token = _deadline.set(limit)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Secondes restantes avant le deadline, None si aucun deadline."""
+    limit = _deadline.get()
+    if limit is None:
+        return None
+    return max(0.0, limit - time.monotonic())
+
+
+# ============ CIRCUIT BREAKER ============
+
+class CircuitBreaker:
+    """Circuit breaker simple: closed -> open -> half-open -> closed."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """True si on peut appeler l'amont maintenant."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            # Un seul appel de test à la fois
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release_probe(self):
+        """Libère le créneau de test sans conclure (appel annulé ou non imputable à l'amont)."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"🔴 Circuit {self.name} ouvert après {self.failures} échecs")
+            self.opened_at = time.monotonic()
+
+
+# ============ UPSTREAM ============
+
+class Upstream:
+    """Un service amont: client httpx partagé + timeout + circuit breaker."""
+
+    def __init__(self, name: str, base_url: str, timeout: float, breaker: CircuitBreaker):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.breaker = breaker
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout)
+        return self._client
+
+    def _budget(self) -> float:
+        """Timeout effectif de l'appel: min(timeout amont, temps restant)."""
+        left = remaining_time()
+        if left is None:
+            return self.timeout
+        if left <= 0:
+            raise DeadlineExceeded(f"{self.name}: deadline dépassé")
+        return min(self.timeout, left)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        hedge_after: Optional[float] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Envoie une requête à l'amont en respectant deadline et circuit breaker.
+
+        Args:
+            method, path: requête HTTP (path relatif à base_url)
+            hedge_after: délai avant d'envoyer une requête de secours
+                (uniquement pour des requêtes idempotentes)
+            **kwargs: passés à httpx (params, headers, ...)
+
+        Raises:
+            CircuitOpenError, DeadlineExceeded, httpx.HTTPError, asyncio.TimeoutError
+        """
+        budget = self._budget()
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name}: circuit ouvert")
+
+        try:
+            if hedge_after and hedge_after < budget:
+                response = await self._hedged(method, path, budget, hedge_after, **kwargs)
+            else:
+                response = await asyncio.wait_for(
+                    self._send(method, path, budget, **kwargs), budget
+                )
+        except Exception as e:
+            if not self._cut_by_deadline(e, budget):
+                self.breaker.record_failure()
+            raise
+        finally:
+            # Appel annulé (CancelledError) ou coupé par le deadline: sans
+            # ça un appel de test laisserait le circuit half-open bloqué
+            self.breaker.release_probe()
+
+        # Les erreurs 5xx comptent comme une panne de l'amont, pas les 4xx
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _cut_by_deadline(self, error: Exception, budget: float) -> bool:
+        """
+        True si le timeout vient du budget de l'appelant et non de l'amont.
+
+        L'amont n'est pas en cause s'il n'a simplement pas eu son timeout
+        complet: ça ne doit pas ouvrir le circuit pour toutes les requêtes.
+        """
+        timed_out = isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException))
+        return timed_out and budget < self.timeout
+
+    async def _send(self, method: str, path: str, budget: float, **kwargs) -> httpx.Response:
+        return await self.client.request(method, path, timeout=budget, **kwargs)
+
+    async def _hedged(
+        self, method: str, path: str, budget: float, hedge_after: float, **kwargs
+    ) -> httpx.Response:
+        """Envoie une 2e requête si la 1re n'a pas répondu après hedge_after."""
+        started = time.monotonic()
+        tasks = {asyncio.create_task(self._send(method, path, budget, **kwargs))}
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+
+        if not done:
+            left = budget - (time.monotonic() - started)
+            tasks.add(asyncio.create_task(self._send(method, path, left, **kwargs)))
+
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                left = budget - (time.monotonic() - started)
+                if left <= 0:
+                    break
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=left, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if error is not None:
+            raise error
+        raise asyncio.TimeoutError(f"{self.name}: pas de réponse en {budget:.1f}s")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# ============ REGISTRE ============
+
+_upstreams: dict[str, Upstream] = {}
+
+
+def get_upstream(name: str) -> Upstream:
+    """Retourne l'amont 'flight', 'weather' ou 'satellite' (créé au 1er appel)."""
+    if name not in _upstreams:
+        settings = get_settings()
+        base_urls = {
+            "flight": (settings.flight_service_url, settings.flight_timeout_seconds),
+            "weather": (settings.weather_service_url, settings.weather_timeout_seconds),
+            "satellite": (settings.satellite_service_url, settings.satellite_timeout_seconds),
+        }
+        base_url, timeout = base_urls[name]
+        breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_seconds=settings.circuit_reset_seconds,
+        )
+        _upstreams[name] = Upstream(name, base_url, timeout, breaker)
+    return _upstreams[name]
+
+
+async def close_upstreams():
+    """Ferme les pools de connexions (arrêt de l'app)."""
+    for upstream in _upstreams.values():
+        await upstream.aclose()
@@ -9,10 +9,21 @@ les coordonnées depuis notre API /api/impacts/{impact_id}.
 IMPORTANT: On appelle ce service APRÈS avoir créé l'impact en base,
 car le satellite-service va faire un GET sur notre API pour récupérer
 les coordonnées (lat/lon) de l'impact.
+
+Les tuiles sont en général lancées en fond (trigger_tile_in_background):
+une réponse n'attend jamais le satellite-service, et le nombre d'appels
+en parallèle est borné (pool HTTP et circuit breaker satellite).
 """
 
-import httpx
+import asyncio
+from typing import Optional
+
 from app.config import get_settings
+from app.services.resilience import get_upstream
+
+# Tuiles lancées en fond (références gardées jusqu'à la fin)
+_background: set[asyncio.Task] = set()
+_semaphore: Optional[asyncio.Semaphore] = None
 
 
 async def trigger_satellite_tile(impact_id: str) -> bool:
@@ -36,14 +47,28 @@ async def trigger_satellite_tile(impact_id: str) -> bool:
         print(f"🛰️ [MOCK] Satellite tile triggered for impact {impact_id}")
         return True
     
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            response = await client.put(
-                f"{settings.satellite_service_url}/satellites/tiles/impacts/{impact_id}"
-            )
-            response.raise_for_status()
-            print(f"🛰️ Satellite tile generated for impact {impact_id}")
-            return True
-        except Exception as e:
-            print(f"⚠️ Satellite service error: {e}")
-            return False
+    try:
+        response = await get_upstream("satellite").request(
+            "PUT", f"/satellites/tiles/impacts/{impact_id}"
+        )
+        response.raise_for_status()
+        print(f"🛰️ Satellite tile generated for impact {impact_id}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Satellite service error: {e}")
+        return False
+
+
+async def _bounded_trigger(impact_id: str):
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(get_settings().satellite_concurrency)
+    async with _semaphore:
+        await trigger_satellite_tile(impact_id)
+
+
+def trigger_tile_in_background(impact_id: str):
+    """Déclenche une tuile sans l'attendre (au plus `satellite_concurrency` à la fois)."""
+    task = asyncio.create_task(_bounded_trigger(impact_id))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
@@ -0,0 +1,124 @@
+"""
+Snapshot Reader
+===============
+Lecture des snapshots OpenSky enregistrés par flight-service (RECORD_DIR).
+
+Même format que flight-service/snapshots.py (fichiers .fsnap, un bloc par
+snapshot, une colonne compressée zlib par champ du state vector). On ne
+garde ici que la partie lecture, plus la conversion en FlightPosition.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone
+
+from app.models.impact import FlightPosition
+
+MAGIC = b"FSNP"
+FILE_SUFFIX = ".fsnap"
+HEADER_SIZE = len(MAGIC) + 1  # MAGIC + version
+
+_LITTLE = sys.byteorder == "little"
+
+
+def list_snapshots(directory: str) -> list[tuple[int, str, int]]:
+    """
+    Indexe tous les snapshots d'un dossier sans les décompresser.
+
+    Returns:
+        Liste triée de (timestamp, chemin du fichier, offset du bloc)
+    """
+    index = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(FILE_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        if os.path.getsize(path) < HEADER_SIZE:
+            continue  # vide ou tronqué à la création (mmap refuse 0 octet)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:4] != MAGIC:
+                continue
+            offset = HEADER_SIZE
+            while offset + 4 <= len(buf):
+                (meta_len,) = struct.unpack_from("<I", buf, offset)
+                if offset + 4 + meta_len > len(buf):
+                    break  # bloc en cours d'écriture
+                meta = json.loads(bytes(buf[offset + 4:offset + 4 + meta_len]))
+                end = offset + 4 + meta_len + sum(c[2] for c in meta["cols"])
+                if end > len(buf):
+                    break
+                index.append((meta["time"], path, offset))
+                offset = end
+    index.sort()
+    return index
+
+
+def _decode_column(raw: bytes, kind: str, n: int) -> list:
+    if kind == "s":
+        if n == 0:
+            return []
+        return [None if v == "\x00" else v for v in raw.decode("utf-8").split("\n")]
+    arr = array("d" if kind == "f" else "b")
+    arr.frombytes(raw)
+    if not _LITTLE:
+        arr.byteswap()
+    if kind == "b":
+        return [None if v < 0 else bool(v) for v in arr]
+    return [None if math.isnan(v) else v for v in arr]
+
+
+def read_columns(path: str, offset: int, names: set[str]) -> tuple[int, dict[str, list]]:
+    """
+    Lit un snapshot et décompresse uniquement les colonnes demandées.
+
+    Returns:
+        (timestamp, {nom de colonne: valeurs})
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        (meta_len,) = struct.unpack_from("<I", buf, offset)
+        pos = offset + 4
+        meta = json.loads(bytes(buf[pos:pos + meta_len]))
+        pos += meta_len
+        columns = {}
+        for name, kind, size in meta["cols"]:
+            if name in names:
+                columns[name] = _decode_column(zlib.decompress(buf[pos:pos + size]), kind, meta["n"])
+            pos += size
+    return meta["time"], columns
+
+
+_POSITION_COLUMNS = {
+    "icao24", "callsign", "lon", "lat", "baro_altitude", "on_ground", "velocity", "true_track",
+}
+
+
+def read_positions(path: str, offset: int) -> list[FlightPosition]:
+    """
+    Convertit un snapshot en positions de vol (mêmes règles que flight-service:
+    on ignore les avions au sol et ceux sans position).
+    """
+    ts, cols = read_columns(path, offset, _POSITION_COLUMNS)
+    timestamp = datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+
+    positions = []
+    for i, icao24 in enumerate(cols["icao24"]):
+        lat, lon = cols["lat"][i], cols["lon"][i]
+        if cols["on_ground"][i] is True or not lat or not lon:
+            continue
+        positions.append(FlightPosition(
+            flight_id=icao24 or "unknown",
+            callsign=(cols["callsign"][i] or "").strip() or None,
+            latitude=lat,
+            longitude=lon,
+            altitude=cols["baro_altitude"][i] or 0,
+            speed=cols["velocity"][i],
+            heading=cols["true_track"][i],
+            timestamp=timestamp,
+        ))
+    return positions
@@ -0,0 +1,173 @@
+"""
+Synthetic Weather
+=================
+Champ météo synthétique déterministe pour les tests de charge.
+
+Contrairement à `_mock_weather_risk` (tirages indépendants à chaque
+appel), ce champ est:
+
+- reproductible: entièrement défini par une graine (seed);
+- cohérent dans l'espace: des vols proches voient la même météo;
+- évolutif dans le temps: chaque couche dérive vers l'est à sa propre
+  vitesse (advection), comme des cellules orageuses poussées par le vent.
+
+Chaque danger est une couche sur une grille lat/lon (bruit "value noise"
+multi-octaves construit avec numpy). Les lectures en lot sont vectorisées:
+une seule interpolation bilinéaire numpy pour tous les vols.
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+
+from app.models.impact import WeatherRisk, WeatherHazard
+
+# (type de danger, vitesse de dérive vers l'est en degrés/heure)
+LAYERS = [
+    ("thunderstorm", 4.0),
+    ("turbulence", 7.0),
+    ("icing", 2.5),
+    ("wind_shear", 5.5),
+    ("low_visibility", 1.5),
+]
+
+# Une couche devient un danger au-delà de ce seuil
+HAZARD_THRESHOLD = 0.35
+
+# Octaves du bruit: (taille de la grille grossière en lat, poids)
+_OCTAVES = [(6, 0.5), (12, 0.3), (24, 0.2)]
+
+# Grille finale: 1 degré (lat -90..90 inclus, lon -180..179)
+_LAT_CELLS = 181
+_LON_CELLS = 360
+
+
+def _upsample(coarse: np.ndarray) -> np.ndarray:
+    """Interpolation bilinéaire d'une grille grossière vers la grille 1°, périodique en longitude."""
+    rows, cols = coarse.shape
+    wrapped = np.concatenate([coarse, coarse[:, :1]], axis=1)  # continuité à l'antiméridien
+    y = np.linspace(0, rows - 1, _LAT_CELLS)
+    x = np.linspace(0, cols, _LON_CELLS, endpoint=False)
+    y0 = np.minimum(y.astype(int), rows - 2)
+    x0 = x.astype(int)
+    fy = (y - y0)[:, None]
+    fx = (x - x0)[None, :]
+    top = wrapped[y0][:, x0] * (1 - fx) + wrapped[y0][:, x0 + 1] * fx
+    bottom = wrapped[y0 + 1][:, x0] * (1 - fx) + wrapped[y0 + 1][:, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+@lru_cache(maxsize=4)
+def build_field(seed: int) -> np.ndarray:
+    """Construit les couches (n_couches, lat, lon) avec des valeurs dans [0, 1]."""
+    rng = np.random.default_rng(seed)
+    layers = []
+    for _ in LAYERS:
+        layer = np.zeros((_LAT_CELLS, _LON_CELLS))
+        for size, weight in _OCTAVES:
+            layer += weight * _upsample(rng.random((size + 1, size * 2)))
+        # Étirer le contraste pour avoir des zones calmes et des cellules marquées
+        layer = (layer - layer.min()) / (layer.max() - layer.min())
+        layers.append(np.clip((layer - 0.3) / 0.7, 0.0, 1.0))
+    return np.stack(layers)
+
+
+def _altitude_factors(alts: np.ndarray) -> np.ndarray:
+    """Modulation des couches selon l'altitude (m): (n_couches, n)."""
+    alts = np.nan_to_num(alts, nan=0.0)
+    high = np.clip(alts / 11000.0, 0.0, 1.0)                        # 0 au sol, 1 en croisière
+    mid = np.exp(-(((alts - 5000.0) / 3000.0) ** 2))                # pic vers 5000 m
+    low = 1.0 - high
+    return np.stack([
+        0.6 + 0.4 * mid,    # thunderstorm: surtout en altitude moyenne
+        0.5 + 0.5 * high,   # turbulence: plutôt en croisière
+        0.3 + 0.7 * mid,    # icing: couches moyennes
+        0.3 + 0.7 * low,    # wind_shear: basses couches
+        0.2 + 0.8 * low,    # low_visibility: près du sol
+    ])
+
+
+def sample(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    alts: np.ndarray,
+    hours: np.ndarray,
+    seed: int,
+) -> np.ndarray:
+    """
+    Valeurs des couches pour n positions (vectorisé).
+
+    Args:
+        lats, lons, alts: positions (degrés, degrés, mètres)
+        hours: temps en heures depuis l'epoch Unix (pour la dérive)
+        seed: graine du champ
+
+    Returns:
+        Tableau (n, n_couches) dans [0, 1]
+    """
+    field = build_field(seed)
+    drift = np.array([speed for _, speed in LAYERS])[:, None]       # (couches, 1)
+
+    y = np.clip(np.asarray(lats, dtype=float) + 90.0, 0.0, _LAT_CELLS - 1.0)
+    x = np.mod(np.asarray(lons, dtype=float)[None, :] + 180.0 - drift * np.asarray(hours)[None, :], _LON_CELLS)
+
+    y0 = np.minimum(y.astype(int), _LAT_CELLS - 2)
+    fy = y - y0
+    x0 = x.astype(int)
+    x1 = (x0 + 1) % _LON_CELLS
+    fx = x - x0
+
+    idx = np.arange(len(LAYERS))[:, None]
+    values = (
+        field[idx, y0, x0] * (1 - fx) * (1 - fy)
+        + field[idx, y0, x1] * fx * (1 - fy)
+        + field[idx, y0 + 1, x0] * (1 - fx) * fy
+        + field[idx, y0 + 1, x1] * fx * fy
+    )
+    values *= _altitude_factors(np.asarray(alts, dtype=float))
+    return values.T
+
+
+def _hours(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp() / 3600.0
+
+
+def synthetic_weather_risks(
+    points: list[tuple[float, float, float, datetime]],
+    seed: int,
+) -> list[WeatherRisk]:
+    """
+    WeatherRisk pour une liste de (lat, lon, alt, timestamp), en un seul calcul vectorisé.
+    """
+    if not points:
+        return []
+    lats, lons, alts, times = zip(*points)
+    values = sample(
+        np.array(lats), np.array(lons), np.array(alts, dtype=float),
+        np.array([_hours(t) for t in times]), seed,
+    )
+
+    risks = []
+    for (lat, lon, alt, ts), row in zip(points, values):
+        hazards = [
+            WeatherHazard(
+                type=name,
+                severity=round(float(value), 2),
+                description=f"Détecté à {alt}ft"
+            )
+            for (name, _), value in zip(LAYERS, row)
+            if value >= HAZARD_THRESHOLD
+        ]
+        overall = 0.2 + 0.8 * float(row.max())
+        risks.append(WeatherRisk(
+            latitude=lat,
+            longitude=lon,
+            altitude=alt,
+            timestamp=ts,
+            overall_score=round(min(overall, 1.0), 2),
+            hazards=hazards
+        ))
+    return risks
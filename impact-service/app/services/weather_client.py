@@ -7,11 +7,12 @@ Le weather-service (PHP/Slim) expose l'API OpenWeather avec cache.
 Endpoint: GET /v1/onecall?lat=...&lon=...
 """
 
+import asyncio
 import random
-import httpx
 from datetime import datetime
-from app.models.impact import WeatherRisk, WeatherHazard
+from app.models.impact import WeatherRisk, WeatherHazard, FlightPosition
 from app.config import get_settings
+from app.services.resilience import get_upstream
 
 
 async def get_weather_risk(lat: float, lon: float, alt: float) -> WeatherRisk:
@@ -29,36 +30,73 @@ async def get_weather_risk(lat: float, lon: float, alt: float) -> WeatherRisk:
     settings = get_settings()
     
     if settings.use_mock_weather:
+        if settings.mock_weather_mode == "synthetic":
+            return _synthetic_weather_risks([(lat, lon, alt, datetime.utcnow())])[0]
         return _mock_weather_risk(lat, lon, alt)
     else:
         return await _fetch_weather_risk(lat, lon, alt)
 
 
+async def get_weather_risks(positions: list[FlightPosition], concurrency: int = 1) -> list[WeatherRisk]:
+    """
+    Récupère les risques météo pour plusieurs positions (même ordre).
+    
+    En mode synthétique, tout le lot est calculé en une seule passe
+    vectorisée, à l'heure d'observation de chaque vol. Sinon on appelle
+    get_weather_risk pour chaque position, au plus `concurrency` à la fois.
+    """
+    settings = get_settings()
+    
+    if settings.use_mock_weather and settings.mock_weather_mode == "synthetic":
+        return _synthetic_weather_risks([
+            (p.latitude, p.longitude, p.altitude, p.timestamp) for p in positions
+        ])
+    
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    
+    async def fetch(p: FlightPosition) -> WeatherRisk:
+        async with semaphore:
+            return await get_weather_risk(p.latitude, p.longitude, p.altitude)
+    
+    return list(await asyncio.gather(*(fetch(p) for p in positions)))
+
+
+def _synthetic_weather_risks(points: list[tuple]) -> list[WeatherRisk]:
+    """Champ météo synthétique déterministe (voir synthetic_weather.py)."""
+    # Import local: numpy n'est chargé que si le mode synthétique est utilisé
+    from app.services.synthetic_weather import synthetic_weather_risks
+    return synthetic_weather_risks(points, get_settings().synthetic_weather_seed)
+
+
 async def _fetch_weather_risk(lat: float, lon: float, alt: float) -> WeatherRisk:
     """
     Appelle le vrai weather-service.
     
     Le weather-service expose /v1/onecall qui proxy OpenWeather.
     On analyse la réponse pour extraire les dangers météo.
+    
+    Si le service est lent on envoie une requête de secours (hedging);
+    s'il est en panne (circuit ouvert) ou si le budget de la requête est
+    épuisé, on bascule tout de suite sur le mock.
     """
     settings = get_settings()
     
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            response = await client.get(
-                f"{settings.weather_service_url}/v1/onecall",
-                params={"lat": lat, "lon": lon},
-                headers={"X-Internal-Token": settings.weather_internal_token}
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Analyser la réponse OpenWeather pour extraire les risques
-            return _parse_weather_response(data, lat, lon, alt)
-            
-        except Exception as e:
-            print(f"⚠️ Weather service error: {e}, using mock")
-            return _mock_weather_risk(lat, lon, alt)
+    try:
+        response = await get_upstream("weather").request(
+            "GET", "/v1/onecall",
+            hedge_after=settings.weather_hedge_after_seconds,
+            params={"lat": lat, "lon": lon},
+            headers={"X-Internal-Token": settings.weather_internal_token}
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        # Analyser la réponse OpenWeather pour extraire les risques
+        return _parse_weather_response(data, lat, lon, alt)
+        
+    except Exception as e:
+        print(f"⚠️ Weather service error: {e!r}, using mock")
+        return _mock_weather_risk(lat, lon, alt)
 
 
 def _parse_weather_response(data: dict, lat: float, lon: float, alt: float) -> WeatherRisk:
@@ -139,7 +177,7 @@ def _parse_weather_response(data: dict, lat: float, lon: float, alt: float) -> W
 
 
 def _mock_weather_risk(lat: float, lon: float, alt: float) -> WeatherRisk:
-    """Génère des données météo simulées."""
+    """Génère des données météo simulées (aléatoires, indépendantes à chaque appel)."""
     
     # Types de dangers possibles
     hazard_types = ["thunderstorm", "turbulence", "icing", "wind_shear", "low_visibility"]